@@ -0,0 +1,34 @@
+"""
+Application Settings
+Environment and .env configuration, parsed once at import
+"""
+
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Backend configuration read from environment variables and .env"""
+
+    database_url: str = "sqlite:///./panel_configurator.db"
+    log_level: str = "INFO"
+    run_create_all: bool = False  # Create tables on app import (local development)
+    
+    # Connections per worker process (server databases only); every worker holds up to
+    # db_pool_size + db_max_overflow + async_db_pool_size + async_db_max_overflow, so keep
+    # that times the worker count under the server's max_connections
+    db_pool_size: int = 10
+    db_max_overflow: int = 5
+    # The async engine only serves the devices routes
+    async_db_pool_size: int = 5
+    async_db_max_overflow: int = 0
+
+    # DigiKey API credentials
+    digikey_client_id: Optional[str] = None
+    digikey_client_secret: Optional[str] = None
+    digikey_sandbox: bool = True
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+settings = Settings()
@@ -1,14 +1,68 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from typing import AsyncGenerator
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./panel_configurator.db"
+from config import settings
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+# The devices router uses AsyncSession, so only backends with an async driver are supported
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+database_url = make_url(SQLALCHEMY_DATABASE_URL)
+backend_name = database_url.get_backend_name()
+if backend_name not in ASYNC_DRIVERS:
+    raise RuntimeError(
+        f"Unsupported DATABASE_URL backend '{backend_name}': "
+        f"use one of {', '.join(ASYNC_DRIVERS)} (the devices API needs an async driver)"
+    )
+
+engine_options = {"insertmanyvalues_page_size": 1000}
+if backend_name == "sqlite":
+    engine_options["connect_args"] = {"check_same_thread": False}
+    if database_url.database in (None, "", ":memory:"):
+        # Every new connection to a plain in-memory database gets an empty database of its
+        # own, so both engines open one named shared-cache database instead. Each engine keeps
+        # its single connection open, which keeps the database alive.
+        database_url = database_url.set(database="file:panel_configurator?mode=memory&cache=shared", query={"uri": "true"})
+        engine_options["poolclass"] = StaticPool
+else:
+    engine_options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+    if database_url.get_driver_name() == "psycopg2":
+        # Collapse executemany() calls into multi-row INSERT ... VALUES batches
+        engine_options["executemany_mode"] = "values_plus_batch"
+
+engine = create_engine(database_url, **engine_options)
+
+# Async engine on the same database for routers that use AsyncSession
+async_database_url = database_url.set(drivername=f"{backend_name}+{ASYNC_DRIVERS[backend_name]}")
+async_engine_options = {k: v for k, v in engine_options.items() if k != "executemany_mode"}
+if "pool_size" in async_engine_options:
+    # Its own, smaller connection budget rather than a copy of the sync engine's
+    async_engine_options.update(pool_size=settings.async_db_pool_size, max_overflow=settings.async_db_max_overflow)
+async_engine = create_async_engine(async_database_url, **async_engine_options)
+
+if backend_name == "sqlite" and "poolclass" not in engine_options:
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL with NORMAL sync so commits don't fsync the main database file"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay loaded after commit; lazy refreshes are not possible under asyncio
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -18,3 +72,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,17 +1,23 @@
-import os
-from dotenv import load_dotenv
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from config import settings
 from routers import panels, devices, wiring, templates, template_sync
 from database import engine, Base
+# Imported eagerly so mappers are configured before worker processes fork
+import models  # noqa: F401
 
-# Load environment variables from .env file
-load_dotenv()
+logging.basicConfig(level=settings.log_level)
+logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Schema creation normally happens once in db_migrations/init_sqlalchemy_db.py;
+# opt in to running it per process for local development
+if settings.run_create_all:
+    Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
+    default_response_class=ORJSONResponse,
     title="Electrical Panel Configurator API",
     description="API for configuring electrical panels, devices, and wiring",
     version="1.0.0"
@@ -20,16 +26,17 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     """Log configuration on startup"""
-    digikey_client_id = os.getenv('DIGIKEY_CLIENT_ID', 'Not set')
-    digikey_client_secret = os.getenv('DIGIKEY_CLIENT_SECRET', 'Not set')
-    sandbox_mode = os.getenv('DIGIKEY_SANDBOX', 'true')
-    
-    print("🔌 Electrical Panel Configurator API Starting...")
-    print(f"   DigiKey Client ID: {'✅ Set' if digikey_client_id != 'Not set' else '❌ Not set'}")
-    print(f"   DigiKey Client Secret: {'✅ Set' if digikey_client_secret != 'Not set' else '❌ Not set'}")
-    print(f"   Sandbox Mode: {sandbox_mode}")
-    print("   API Documentation: http://127.0.0.1:8000/docs")
-    print("🚀 Ready to accept requests!")
+    logger.info("🔌 Electrical Panel Configurator API Starting...")
+    logger.info("   DigiKey Client ID: %s", '✅ Set' if settings.digikey_client_id else '❌ Not set')
+    logger.info("   DigiKey Client Secret: %s", '✅ Set' if settings.digikey_client_secret else '❌ Not set')
+    logger.info("   Sandbox Mode: %s", settings.digikey_sandbox)
+    logger.info("   API Documentation: http://127.0.0.1:8000/docs")
+    logger.info("🚀 Ready to accept requests!")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Close outbound connection pools"""
+    template_sync.close_digikey_client()
 
 # Configure CORS
 app.add_middleware(
@@ -52,10 +59,15 @@ app.include_router(wiring.router, prefix="/api/wiring", tags=["wiring"])
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
 app.include_router(template_sync.router, tags=["template-sync"])
 
+# Static payloads are encoded once and reused for every request
+ROOT_RESPONSE = ORJSONResponse({"message": "Electrical Panel Configurator API"})
+HEALTH_RESPONSE = ORJSONResponse({"status": "healthy"})
+
 @app.get("/")
 def read_root():
-    return {"message": "Electrical Panel Configurator API"}
+    return ROOT_RESPONSE
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return HEALTH_RESPONSE
+
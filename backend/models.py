@@ -1,14 +1,24 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Text, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Text, DateTime, Index, JSON, Computed, DDL, event, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, configure_mappers
 from sqlalchemy.sql import func
-from sqlalchemy.ext.hybrid import hybrid_property
-from database import Base
+from database import Base, engine
+
+# Native JSON storage; JSONB on PostgreSQL so the column can be GIN indexed
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+# Trigram indexes need the pg_trgm extension before the tables are created
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
+def trigram_index(name: str, column: str) -> Index:
+    """PostgreSQL GIN trigram index, so the ilike('%x%') list filters on column can use an index scan"""
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}).ddl_if(dialect="postgresql")
 
 class PanelTemplate(Base):
     __tablename__ = "panel_templates"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)  # e.g., "Hager Volta VU24NW"
+    name = Column(String)  # e.g., "Hager Volta VU24NW"
     model = Column(String)  # e.g., "VU24NW"
     manufacturer = Column(String, default="Hager")
     series = Column(String, nullable=True)  # e.g., "Volta"
@@ -20,12 +30,23 @@ class PanelTemplate(Base):
     protection_rating = Column(String, nullable=True)  # e.g., "IP40", "IP65"
     description = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)  # For soft delete/deactivation
+    # Generated by the database; SQLite keeps it virtual (computed on read)
+    total_slots = Column(Integer, Computed("rows * slots_per_row", persisted=engine.dialect.name != "sqlite"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    @hybrid_property
-    def total_slots(self):
-        return self.rows * self.slots_per_row
+    __table_args__ = (
+        Index("ix_paneltpl_mfr_series_model", "manufacturer", "series", "model"),
+        Index("ix_paneltpl_mfr_model", "manufacturer", "model", unique=True),
+        Index("ix_paneltpl_active_name", "name", postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        trigram_index("ix_paneltpl_manufacturer_trgm", "manufacturer"),
+        trigram_index("ix_paneltpl_series_trgm", "series"),
+        # Library browsing: exact manufacturer match among active templates, already in display order
+        Index(
+            "ix_paneltpl_library", text("lower(manufacturer)"), "series", "total_slots", postgresql_include=["id"],
+            postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")
+        ),
+    )
     
     # Relationships
     panels = relationship("Panel", back_populates="template")
@@ -34,7 +55,7 @@ class DeviceTemplate(Base):
     __tablename__ = "device_templates"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)  # e.g., "MCB 16A C-Curve"
+    name = Column(String)  # e.g., "MCB 16A C-Curve"
     model = Column(String)  # e.g., "MBN116"
     manufacturer = Column(String, default="Hager")
     series = Column(String, nullable=True)  # e.g., "MBN"
@@ -50,12 +71,28 @@ class DeviceTemplate(Base):
     pole_count = Column(Integer, nullable=True)  # 1P, 2P, 3P, 4P
     width_in_modules = Column(Float, default=1.0)  # Physical width (1 module = 18mm)
     mounting_type = Column(String, nullable=True)  # "DIN Rail", "Panel Mount"
-    features = Column(Text, nullable=True)  # JSON string for additional features
+    features = Column(JSONType, nullable=True)  # JSON value for additional features
     description = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)  # For soft delete/deactivation
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("ix_devtpl_lookup", "device_type", "category", "is_active"),
+        Index("ix_devtpl_mfr_model", "manufacturer", "model", unique=True),
+        Index("ix_devtpl_active_name", "name", postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")),
+        Index("ix_devtpl_features_gin", "features", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        trigram_index("ix_devtpl_manufacturer_trgm", "manufacturer"),
+        trigram_index("ix_devtpl_series_trgm", "series"),
+        trigram_index("ix_devtpl_device_type_trgm", "device_type"),
+        trigram_index("ix_devtpl_category_trgm", "category"),
+        # Library browsing: exact manufacturer match among active templates, already in display order
+        Index(
+            "ix_devtpl_library", text("lower(manufacturer)"), "category", "name", postgresql_include=["id"],
+            postgresql_where=text("is_active"), sqlite_where=text("is_active = 1")
+        ),
+    )
+    
     # Relationships
     device_instances = relationship("PanelSlot", back_populates="device_template")
 
@@ -63,13 +100,14 @@ class Panel(Base):
     __tablename__ = "panels"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)  # Instance-specific name
+    name = Column(String)  # Instance-specific name
     template_id = Column(Integer, ForeignKey("panel_templates.id"))
     location = Column(String, nullable=True)  # Installation location
     installation_date = Column(DateTime(timezone=True), nullable=True)
     description = Column(Text, nullable=True)  # Instance-specific description
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    slots_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped whenever a slot changes; keys can-place ETags
     
     # Relationships
     template = relationship("PanelTemplate", back_populates="panels")
@@ -87,7 +125,7 @@ class PanelSlot(Base):
     device_template_id = Column(Integer, ForeignKey("device_templates.id"), nullable=True)
     device_label = Column(String, nullable=True)  # Custom label for this instance
     current_setting = Column(Float, nullable=True)  # e.g., breaker trip current
-    custom_properties = Column(Text, nullable=True)  # JSON string for instance-specific properties
+    custom_properties = Column(JSONType, nullable=True)  # JSON value for instance-specific properties
     is_occupied = Column(Boolean, default=False)
     spans_slots = Column(Integer, default=1)  # For devices that span multiple slots
     installed_date = Column(DateTime(timezone=True), nullable=True)
@@ -97,6 +135,12 @@ class PanelSlot(Base):
     device_template = relationship("DeviceTemplate", back_populates="device_instances")
     input_wires = relationship("Wire", foreign_keys="[Wire.destination_slot_id]", back_populates="destination_slot")
     output_wires = relationship("Wire", foreign_keys="[Wire.source_slot_id]", back_populates="source_slot")
+    
+    __table_args__ = (
+        # Row fetches and placement span checks seek to (panel_id, row) and walk by column;
+        # unique so a panel position can only ever hold one slot (and so one occupant)
+        Index("ix_panelslot_panel_row_col", "panel_id", "row", "column", unique=True),
+    )
 
 class Wire(Base):
     __tablename__ = "wires"
@@ -117,3 +161,18 @@ class Wire(Base):
     panel = relationship("Panel", back_populates="wires")
     source_slot = relationship("PanelSlot", foreign_keys=[source_slot_id], back_populates="output_wires")
     destination_slot = relationship("PanelSlot", foreign_keys=[destination_slot_id], back_populates="input_wires")
+
+class SyncJob(Base):
+    __tablename__ = "sync_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="pending")  # pending, running, completed, completed_with_errors, failed
+    manufacturers = Column(JSONType)  # Manufacturers requested for this sync
+    component_types = Column(JSONType, nullable=True)
+    results = Column(JSONType, nullable=True)  # Per-manufacturer sync results
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+# Resolve all relationships once at import instead of lazily on the first query
+configure_mappers()
@@ -0,0 +1,41 @@
+"""
+HTTP helpers shared by the routers
+"""
+
+from typing import Any, Dict, Optional, Type, TypeVar
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Whether an If-None-Match header lists the given entity tag"""
+    return if_none_match is not None and etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def not_modified(headers: Dict[str, str], if_none_match: Optional[str]) -> Optional[Response]:
+    """An empty 304 carrying the headers when the client already holds their ETag, otherwise None"""
+    if etag_matches(headers["ETag"], if_none_match):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def update_returning(db: Session, model, row_id: int, values: Dict[str, Any], schema: Type[SchemaT], not_found: str) -> SchemaT:
+    """Apply a partial update to one row and return it as schema, committing; 404 with not_found when
+    there is no such row. One UPDATE ... RETURNING both applies the change and reads the row back."""
+    statement = (
+        update(model).where(model.id == row_id).values(**values).returning(model)
+        if values else select(model).where(model.id == row_id)
+    )
+    row = db.scalars(statement).one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail=not_found)
+    
+    # Serialize before commit expires the returned row
+    updated = schema.model_validate(row)
+    db.commit()
+    return updated
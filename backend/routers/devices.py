@@ -1,198 +1,305 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import DeviceTemplate, PanelSlot
-from schemas import PanelSlot as PanelSlotSchema, PanelSlotUpdate
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import RedirectResponse
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
+from typing import List, Optional, Sequence, Tuple
+from database import get_async_db
+from models import DeviceTemplate, Panel, PanelSlot
+from schemas import (
+    DevicePlacementCheck, PanelSlot as PanelSlotSchema, PanelSlotUpdate,
+    PlacementDeviceInfo, PlacementSlotInfo
+)
+from services.template_cache import TemplateInfo, get_template_info
+from routers._http import not_modified
 
 router = APIRouter()
 
-def can_place_device_at_slot(db: Session, slot_id: int, device_template_id: int) -> bool:
-    """Check if a device can be placed at the given slot"""
-    # Get the slot and device template
-    slot = db.query(PanelSlot).filter(PanelSlot.id == slot_id).first()
-    if not slot:
-        return False
+# PanelSlotUpdate fields that map onto PanelSlot columns, resolved once at import
+WRITABLE_SLOT_FIELDS = frozenset(PanelSlotUpdate.model_fields) & frozenset(PanelSlot.__table__.columns.keys())
+
+# The only slot columns the placement checks and span updates read
+ROW_STATE_COLUMNS = (PanelSlot.id, PanelSlot.column, PanelSlot.is_occupied, PanelSlot.spans_slots)
+
+async def fetch_row_slots(db: AsyncSession, slot_id: int, for_update: bool = False) -> Tuple[List[Row], Optional[int]]:
+    """Fetch the placement state (ROW_STATE_COLUMNS) of every slot in the row containing slot_id,
+    ordered by column, in a single query.
+    Returns the row slots and the index of slot_id within them (None if the slot does not exist).
+    With for_update the row is locked (SELECT ... FOR UPDATE) until the transaction ends, so
+    concurrent placements in the same row are serialized instead of racing the free-slot check."""
+    target = select(PanelSlot.panel_id, PanelSlot.row, PanelSlot.column).where(PanelSlot.id == slot_id).subquery()
+    statement = select(*ROW_STATE_COLUMNS, target.c.column.label("target_column")).join(
+        target,
+        and_(PanelSlot.panel_id == target.c.panel_id, PanelSlot.row == target.c.row)
+    ).order_by(PanelSlot.column)
+    if for_update:
+        # SQLite has no row locks and compiles this away; its writers are already serialized
+        statement = statement.with_for_update(of=PanelSlot)
+    results = (await db.execute(statement)).all()
+    if not results:
+        return [], None
     
-    device_template = db.query(DeviceTemplate).filter(DeviceTemplate.id == device_template_id).first()
-    if not device_template:
-        return False
+    row_slots = results
     
-    slots_required = getattr(device_template, 'slots_required', 1)
+    # Columns within a row are consecutive, so the slot index follows from its column
+    slot_index = results[0].target_column - row_slots[0].column
+    if not (0 <= slot_index < len(row_slots) and row_slots[slot_index].id == slot_id):
+        # Row has gaps in its column numbering; fall back to locating the slot directly
+        slot_index = next(i for i, s in enumerate(row_slots) if s.id == slot_id)
     
-    # For single slot devices, just check if current slot is free
-    if slots_required == 1:
-        return not getattr(slot, 'is_occupied', True)
+    return row_slots, slot_index
+
+def row_occupancy_mask(row_slots: Sequence[Row]) -> int:
+    """Pack the row's occupancy into an int: bit i is set when row_slots[i] is occupied"""
+    mask = 0
+    for i, s in enumerate(row_slots):
+        if s.is_occupied:
+            mask |= 1 << i
+    return mask
+
+def span_is_free(occupancy_mask: int, slot_index: int, slots_required: int) -> bool:
+    """Whether no bit of the slots_required-wide window starting at slot_index is set in the mask"""
+    return (occupancy_mask & (((1 << slots_required) - 1) << slot_index)) == 0
+
+# Unrolled span checks for the widths DeviceTemplateMapper assigns (bounds are checked by the caller);
+# they read only the slots in the span instead of packing the whole row into a mask
+SPAN_CHECKERS = {
+    1: lambda slots, i: not slots[i].is_occupied,
+    2: lambda slots, i: not (slots[i].is_occupied or slots[i + 1].is_occupied),
+    3: lambda slots, i: not (slots[i].is_occupied or slots[i + 1].is_occupied or slots[i + 2].is_occupied),
+    4: lambda slots, i: not (slots[i].is_occupied or slots[i + 1].is_occupied or
+                             slots[i + 2].is_occupied or slots[i + 3].is_occupied),
+}
+
+def slots_are_free(row_slots: Sequence[Row], slot_index: int, slots_required: int) -> bool:
+    """Check that slots_required consecutive slots starting at slot_index are free"""
+    # Check if we have enough consecutive slots left in the row
+    if slot_index + slots_required > len(row_slots):
+        return False
     
-    # For multi-slot devices, check consecutive slots in the same row
-    panel_slots = db.query(PanelSlot).filter(
-        PanelSlot.panel_id == slot.panel_id,
-        PanelSlot.row == slot.row
-    ).order_by(PanelSlot.column).all()
+    checker = SPAN_CHECKERS.get(slots_required)
+    if checker is not None:
+        return checker(row_slots, slot_index)
     
-    # Find the starting slot index in its row
-    slot_index = None
-    for i, s in enumerate(panel_slots):
-        if getattr(s, 'id', None) == slot_id:
-            slot_index = i
-            break
+    return span_is_free(row_occupancy_mask(row_slots), slot_index, slots_required)
+
+def find_placement_starts(row_slots: Sequence[Row], slots_required: int) -> List[int]:
+    """Return every index in the row where a device needing slots_required slots fits"""
+    row_length = len(row_slots)
+    if slots_required > row_length:
+        return []
     
-    if slot_index is None:
-        return False
+    free_mask = ~row_occupancy_mask(row_slots) & ((1 << row_length) - 1)
     
-    # Check if we have enough consecutive free slots
-    if slot_index + slots_required > len(panel_slots):
-        return False
+    # Bit i survives only if slots i .. i + slots_required - 1 are all free
+    starts_mask = free_mask
+    for offset in range(1, slots_required):
+        starts_mask &= free_mask >> offset
+    
+    return [i for i in range(row_length - slots_required + 1) if starts_mask >> i & 1]
+
+async def fetch_slot_span_check(db: AsyncSession, slot_id: int, slots_required: int) -> Tuple[Optional[PanelSlot], bool]:
+    """Fetch a slot and check in SQL whether the slots_required columns starting at it are all free.
+    Only the span is read from the (panel_id, row, column) index, not the whole row."""
+    span = aliased(PanelSlot)
+    free_in_span = select(func.count()).where(
+        span.panel_id == PanelSlot.panel_id,
+        span.row == PanelSlot.row,
+        span.column.between(PanelSlot.column, PanelSlot.column + slots_required - 1),
+        span.is_occupied.is_not(True)
+    ).correlate(PanelSlot).scalar_subquery()
     
-    # Check if all required slots are free
-    for i in range(slot_index, slot_index + slots_required):
-        if getattr(panel_slots[i], 'is_occupied', True):
-            return False
+    result = (await db.execute(
+        select(PanelSlot, free_in_span).where(PanelSlot.id == slot_id)
+    )).first()
+    if result is None:
+        return None, False
     
-    return True
+    slot, free_count = result
+    return slot, free_count == slots_required
+
+def can_place_device_at_slot(row_slots: Sequence[Row], slot_index: int, device_template: TemplateInfo) -> bool:
+    """Check if a device can be placed at the given slot of an already fetched row"""
+    return slots_are_free(row_slots, slot_index, device_template.slots_required or 1)
 
 @router.put("/slots/{slot_id}", response_model=PanelSlotSchema)
-def update_panel_slot(slot_id: int, slot_update: PanelSlotUpdate, db: Session = Depends(get_db)):
+async def update_panel_slot(slot_id: int, slot_update: PanelSlotUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update a panel slot with a device"""
-    db_slot = db.query(PanelSlot).filter(PanelSlot.id == slot_id).first()
-    if not db_slot:
+    row_slots, slot_index = await fetch_row_slots(db, slot_id, for_update=True)
+    if slot_index is None:
         raise HTTPException(status_code=404, detail="Panel slot not found")
+    # Only the primary slot is loaded as a full ORM row, with its template for the response
+    db_slot = await db.get(PanelSlot, slot_id, options=[joinedload(PanelSlot.device_template)])
     
     # If placing a device, check if it can be placed
     if slot_update.device_template_id is not None:
         # Get device template to check slot requirements
-        device_template = db.query(DeviceTemplate).filter(DeviceTemplate.id == slot_update.device_template_id).first()
+        device_template = await get_template_info(db, slot_update.device_template_id)
         if not device_template:
             raise HTTPException(status_code=404, detail="Device template not found")
         
         # Check if this is updating an existing device (same device template) or placing a new one
-        current_template_id = getattr(db_slot, 'device_template_id', None)
+        current_template_id = db_slot.device_template_id
         is_same_device = (current_template_id is not None and 
                          current_template_id == slot_update.device_template_id)
         
         # Only check slot availability for new device placements, not when updating properties of existing devices
         if not is_same_device:
             # Check if enough consecutive slots are available
-            if not can_place_device_at_slot(db, slot_id, slot_update.device_template_id):
+            if not can_place_device_at_slot(row_slots, slot_index, device_template):
                 raise HTTPException(status_code=400, detail="Cannot place device at this slot - not enough consecutive free slots")
             
             # Remove any existing device from this slot first (clean up any multi-slot device)
-            remove_device_from_slot(slot_id, db)
+            await clear_slot_state(db, row_slots, slot_index)
         
-        # Update the primary slot with device information
-        for field, value in slot_update.model_dump(exclude_unset=True).items():
-            if hasattr(db_slot, field):
-                setattr(db_slot, field, value)
+        # Update the primary slot with the fields the client sent
+        for field in slot_update.model_fields_set & WRITABLE_SLOT_FIELDS:
+            setattr(db_slot, field, getattr(slot_update, field))
         
         # Only update occupation and slot spanning for new device placements
         if not is_same_device:
-            setattr(db_slot, 'is_occupied', True)
-            setattr(db_slot, 'spans_slots', device_template.slots_required)
+            db_slot.is_occupied = True
+            db_slot.spans_slots = device_template.slots_required
+            db_slot.device_template = await db.get(DeviceTemplate, device_template.id)
         
-        # If device spans multiple slots, mark additional slots as occupied
-        slots_required = getattr(device_template, 'slots_required', 1)
-        if slots_required > 1:
-            # Get all slots in the same row
-            panel_slots = db.query(PanelSlot).filter(
-                PanelSlot.panel_id == db_slot.panel_id,
-                PanelSlot.row == db_slot.row
-            ).order_by(PanelSlot.column).all()
-            
-            # Find starting slot index
-            slot_index = None
-            for i, s in enumerate(panel_slots):
-                if getattr(s, 'id', None) == slot_id:
-                    slot_index = i
-                    break
-            
-            if slot_index is not None:
-                # Mark additional slots as occupied (but not configured)
-                for i in range(slot_index + 1, min(slot_index + slots_required, len(panel_slots))):
-                    additional_slot = panel_slots[i]
-                    setattr(additional_slot, 'is_occupied', True)
-                    setattr(additional_slot, 'device_template_id', None)
-                    setattr(additional_slot, 'spans_slots', 0)
+        # If device spans multiple slots, mark additional slots as occupied (but not configured)
+        slots_required = device_template.slots_required or 1
+        extra_ids = [row_slots[i].id for i in range(slot_index + 1, min(slot_index + slots_required, len(row_slots)))]
+        if extra_ids:
+            # One UPDATE for the whole span; the additional slots are not read again in this request
+            await db.execute(
+                update(PanelSlot)
+                .where(PanelSlot.id.in_(extra_ids))
+                .values(is_occupied=True, device_template_id=None, spans_slots=0)
+                .execution_options(synchronize_session=False)
+            )
         
     else:
         # Just removing a device
-        remove_device_from_slot(slot_id, db)
+        await clear_slot_state(db, row_slots, slot_index)
+        db_slot.device_template = None
+    
+    await bump_slots_version(db, slot_id)
     
-    db.commit()
-    db.refresh(db_slot)
+    # Single commit for the whole placement. Sessions keep attributes after commit,
+    # so the response is built from the in-memory slot without reloading it
+    await db.commit()
     return db_slot
 
+async def bump_slots_version(db: AsyncSession, slot_id: int):
+    """Invalidate the can-place ETags of the panel containing slot_id"""
+    await db.execute(
+        update(Panel)
+        .where(Panel.id == select(PanelSlot.panel_id).where(PanelSlot.id == slot_id).scalar_subquery())
+        .values(slots_version=Panel.slots_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def clear_slot_state(db: AsyncSession, row_slots: Sequence[Row], slot_index: int):
+    """Free the slot at slot_index and every slot its device spans. Leaves committing to the caller."""
+    # If this slot spans multiple slots, we need to free them all
+    is_occupied = row_slots[slot_index].is_occupied
+    spans_slots = row_slots[slot_index].spans_slots
+    
+    # Clear all spanned slots, or just this one for a single slot device or an already cleared slot
+    clear_count = spans_slots if is_occupied and spans_slots > 1 else 1
+    clear_ids = [row_slots[i].id for i in range(slot_index, min(slot_index + clear_count, len(row_slots)))]
+    
+    # One UPDATE for the whole span. update_panel_slot keeps using its loaded primary
+    # slot, so sync it in Python from the WHERE clause (no extra SELECT)
+    await db.execute(
+        update(PanelSlot)
+        .where(PanelSlot.id.in_(clear_ids))
+        .values(device_template_id=None, device_label=None, current_setting=None, is_occupied=False, spans_slots=1)
+        .execution_options(synchronize_session="evaluate")
+    )
+
 @router.delete("/slots/{slot_id}/device")
-def remove_device_from_slot(slot_id: int, db: Session = Depends(get_db)):
+async def remove_device_from_slot(slot_id: int, db: AsyncSession = Depends(get_async_db)):
     """Remove device from a panel slot and free up all spanned slots"""
-    db_slot = db.query(PanelSlot).filter(PanelSlot.id == slot_id).first()
-    if not db_slot:
+    row_slots, slot_index = await fetch_row_slots(db, slot_id, for_update=True)
+    if slot_index is None:
         raise HTTPException(status_code=404, detail="Panel slot not found")
     
-    # If this slot spans multiple slots, we need to free them all
-    is_occupied = getattr(db_slot, 'is_occupied', False)
-    spans_slots = getattr(db_slot, 'spans_slots', 1)
-    
-    if is_occupied and spans_slots > 1:
-        # Get all slots in the same row
-        panel_slots = db.query(PanelSlot).filter(
-            PanelSlot.panel_id == db_slot.panel_id,
-            PanelSlot.row == db_slot.row
-        ).order_by(PanelSlot.column).all()
-        
-        # Find starting slot index
-        slot_index = None
-        for i, s in enumerate(panel_slots):
-            if getattr(s, 'id', None) == slot_id:
-                slot_index = i
-                break
-        
-        if slot_index is not None:
-            # Clear all spanned slots
-            for i in range(slot_index, min(slot_index + spans_slots, len(panel_slots))):
-                slot_to_clear = panel_slots[i]
-                setattr(slot_to_clear, 'device_template_id', None)
-                setattr(slot_to_clear, 'device_label', None)
-                setattr(slot_to_clear, 'current_setting', None)
-                setattr(slot_to_clear, 'is_occupied', False)
-                setattr(slot_to_clear, 'spans_slots', 1)
-    else:
-        # Single slot device or already cleared
-        setattr(db_slot, 'device_template_id', None)
-        setattr(db_slot, 'device_label', None)
-        setattr(db_slot, 'current_setting', None)
-        setattr(db_slot, 'is_occupied', False)
-        setattr(db_slot, 'spans_slots', 1)
-    
-    db.commit()
+    await clear_slot_state(db, row_slots, slot_index)
+    await bump_slots_version(db, slot_id)
+    await db.commit()
     return {"message": "Device removed from slot"}
 
-@router.get("/slots/{slot_id}/can-place/{device_template_id}")
-def check_device_placement(slot_id: int, device_template_id: int, db: Session = Depends(get_db)):
-    """Check if a device can be placed at a specific slot"""
-    can_place = can_place_device_at_slot(db, slot_id, device_template_id)
+@router.get("/slots/{slot_id}/can-place/{device_template_id}", response_model=DevicePlacementCheck)
+async def check_device_placement(
+    slot_id: int,
+    device_template_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Check if a device can be placed at a specific slot.
+    Answers carry an ETag of the panel's slots version, so repeat checks while hovering get a 304."""
+    device_template = await get_template_info(db, device_template_id)
+    slots_required = (device_template.slots_required or 1) if device_template is not None else 1
+    
+    slots_version = (await db.execute(
+        select(Panel.slots_version).join(PanelSlot, PanelSlot.panel_id == Panel.id).where(PanelSlot.id == slot_id)
+    )).scalar()
+    if device_template is not None and slots_version is not None:
+        etag = f'W/"{slot_id}-{slots_version}-{device_template_id}-{slots_required}"'
+        # Clients must revalidate each time: a cached answer would go stale as soon as the panel changes
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        not_modified_response = not_modified(headers, if_none_match)
+        if not_modified_response is not None:
+            return not_modified_response
+        response.headers.update(headers)
+    slot, span_is_free = await fetch_slot_span_check(db, slot_id, slots_required)
     
-    # Get additional info for debugging
-    slot = db.query(PanelSlot).filter(PanelSlot.id == slot_id).first()
-    device_template = db.query(DeviceTemplate).filter(DeviceTemplate.id == device_template_id).first()
+    can_place = device_template is not None and span_is_free
     
+    # Missing rows keep the all-null info objects the client already expects
     return {
         "can_place": can_place,
-        "slot_info": {
-            "id": getattr(slot, 'id', None),
-            "row": getattr(slot, 'row', None),
-            "column": getattr(slot, 'column', None),
-            "is_occupied": getattr(slot, 'is_occupied', None),
-            "spans_slots": getattr(slot, 'spans_slots', None)
-        },
+        "slot_info": slot if slot is not None else PlacementSlotInfo(),
+        "device_info": device_template._asdict() if device_template is not None else PlacementDeviceInfo()
+    }
+
+@router.get("/panels/{panel_id}/rows/{row}/can-place/{device_template_id}")
+async def check_row_device_placement(panel_id: int, row: int, device_template_id: int, db: AsyncSession = Depends(get_async_db)):
+    """List every slot in a panel row where a device can be placed"""
+    device_template = await get_template_info(db, device_template_id)
+    if not device_template:
+        raise HTTPException(status_code=404, detail="Device template not found")
+    
+    row_slots = (await db.execute(
+        select(*ROW_STATE_COLUMNS).where(
+            PanelSlot.panel_id == panel_id,
+            PanelSlot.row == row
+        ).order_by(PanelSlot.column)
+    )).all()
+    if not row_slots:
+        raise HTTPException(status_code=404, detail="Panel row not found")
+    
+    slots_required = device_template.slots_required or 1
+    starts = find_placement_starts(row_slots, slots_required)
+    
+    return {
+        "panel_id": panel_id,
+        "row": row,
         "device_info": {
-            "id": getattr(device_template, 'id', None),
-            "name": getattr(device_template, 'name', None),
-            "slots_required": getattr(device_template, 'slots_required', None)
-        }
+            "id": device_template.id,
+            "name": device_template.name,
+            "slots_required": slots_required
+        },
+        "available_slot_ids": [row_slots[i].id for i in starts]
     }
 
+# The deprecated library route is a fixed permanent redirect, built once and cacheable by clients
+HAGER_LIBRARY_REDIRECT = RedirectResponse(
+    url="/api/templates/library/devices/hager",
+    status_code=301,
+    headers={"Cache-Control": "public, max-age=86400"}
+)
+
 @router.get("/library/hager")
-def get_hager_device_library():
+async def get_hager_device_library():
     """Redirect to template-based device library - DEPRECATED"""
-    from fastapi.responses import RedirectResponse
-    return RedirectResponse(url="/api/templates/library/devices/hager", status_code=301)
\ No newline at end of file
+    return HAGER_LIBRARY_REDIRECT
@@ -1,25 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, joinedload, raiseload, selectinload
 from typing import List
 from database import get_db
-from models import Panel, PanelSlot, PanelTemplate
-from schemas import Panel as PanelSchema, PanelCreate, PanelUpdate, PanelWithSlots
+from models import Panel, PanelSlot, PanelTemplate, Wire
+from schemas import Panel as PanelSchema, PanelCreate, PanelPage, PanelUpdate, PanelWithSlots
+from routers._http import update_returning
 
 router = APIRouter()
 
-@router.get("/", response_model=List[PanelSchema])
-def get_panels(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all panels"""
-    panels = db.query(Panel).offset(skip).limit(limit).all()
-    return panels
+# Read responses are built from the trusted rows without validation and encoded in one pass;
+# returning a Response skips FastAPI's own re-validation (response_model still documents the shape)
+PANEL_PAGE = TypeAdapter(PanelPage)
+
+@router.get("/", response_model=PanelPage)
+def get_panels(after_id: int = 0, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Get a page of panels ordered by id, starting after after_id"""
+    # Keyset pagination seeks on the primary key, so deep pages cost the same as the first
+    panels = db.query(Panel).options(
+        selectinload(Panel.template),
+        raiseload("*")
+    ).filter(Panel.id > after_id).order_by(Panel.id).limit(limit).all()
+    
+    # A short page is the last one
+    page = PanelPage.model_construct(
+        items=[PanelSchema.from_orm_fast(panel) for panel in panels],
+        next=panels[-1].id if len(panels) == limit else None
+    )
+    return Response(PANEL_PAGE.dump_json(page), media_type="application/json")
 
 @router.get("/{panel_id}", response_model=PanelWithSlots)
 def get_panel(panel_id: int, db: Session = Depends(get_db)):
     """Get a specific panel with its slots"""
-    panel = db.query(Panel).filter(Panel.id == panel_id).first()
+    # Load everything the response reads up front; any other lazy load raises instead of querying per slot
+    panel = db.query(Panel).options(
+        joinedload(Panel.template),
+        selectinload(Panel.slots).selectinload(PanelSlot.device_template),
+        raiseload("*")
+    ).filter(Panel.id == panel_id).first()
     if not panel:
         raise HTTPException(status_code=404, detail="Panel not found")
-    return panel
+    return Response(PanelWithSlots.from_orm_fast(panel).model_dump_json(), media_type="application/json")
 
 @router.post("/", response_model=PanelSchema)
 def create_panel(panel: PanelCreate, db: Session = Depends(get_db)):
@@ -29,94 +52,87 @@ def create_panel(panel: PanelCreate, db: Session = Depends(get_db)):
     if not template:
         raise HTTPException(status_code=404, detail="Panel template not found")
     
-    # Create the panel instance
-    panel_data = panel.dict()
-    db_panel = Panel(**panel_data)
-    db.add(db_panel)
-    db.commit()
-    db.refresh(db_panel)
+    # INSERT ... RETURNING gives the id and server defaults in one round-trip, so the panel
+    # and its slots share one commit and the response needs no refresh
+    db_panel = db.scalars(insert(Panel).values(**panel.model_dump()).returning(Panel)).one()
     
     # Create empty slots for the panel organized by rows based on template
-    slot_number = 1
-    template_rows = getattr(template, 'rows', 0)
-    template_slots_per_row = getattr(template, 'slots_per_row', 0)
-    total_slots = getattr(template, 'total_slots', 0)
-    
-    for row in range(1, template_rows + 1):
-        for col in range(1, template_slots_per_row + 1):
-            if slot_number <= total_slots:
-                slot = PanelSlot(
-                    panel_id=db_panel.id,
-                    slot_number=slot_number,
-                    row=row,
-                    column=col,
-                    is_occupied=False,
-                    spans_slots=1
-                )
-                db.add(slot)
-                slot_number += 1
+    slots_per_row = template.slots_per_row or 0
+    slots = [
+        {
+            "panel_id": db_panel.id,
+            "slot_number": (row - 1) * slots_per_row + col,
+            "row": row,
+            "column": col,
+            "is_occupied": False,
+            "spans_slots": 1
+        }
+        for row in range(1, (template.rows or 0) + 1)
+        for col in range(1, slots_per_row + 1)
+    ]
+    if slots:
+        # One executemany; the engine batches it into multi-row INSERTs (insertmanyvalues_page_size)
+        db.execute(insert(PanelSlot), slots)
     
+    # Serialize before commit expires the returned row; the template comes from the identity map
+    created = PanelSchema.model_validate(db_panel)
     db.commit()
-    return db_panel
+    return created
 
 @router.put("/{panel_id}", response_model=PanelSchema)
 def update_panel(panel_id: int, panel_update: PanelUpdate, db: Session = Depends(get_db)):
     """Update a panel"""
-    db_panel = db.query(Panel).filter(Panel.id == panel_id).first()
-    if not db_panel:
-        raise HTTPException(status_code=404, detail="Panel not found")
-    
-    for field, value in panel_update.dict(exclude_unset=True).items():
-        setattr(db_panel, field, value)
-    
-    db.commit()
-    db.refresh(db_panel)
-    return db_panel
+    update_data = panel_update.model_dump(exclude_unset=True)
+    return update_returning(db, Panel, panel_id, update_data, PanelSchema, "Panel not found")
 
 @router.delete("/{panel_id}")
 def delete_panel(panel_id: int, db: Session = Depends(get_db)):
     """Delete a panel"""
-    db_panel = db.query(Panel).filter(Panel.id == panel_id).first()
-    if not db_panel:
+    # Remove the panel's wires and slots with it, children first for the foreign keys
+    db.execute(delete(Wire).where(Wire.panel_id == panel_id))
+    db.execute(delete(PanelSlot).where(PanelSlot.panel_id == panel_id))
+    result = db.execute(delete(Panel).where(Panel.id == panel_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Panel not found")
     
-    db.delete(db_panel)
     db.commit()
     return {"message": "Panel deleted successfully"}
 
+# Predefined templates are static, so they are encoded once at import and reused for every request
+HAGER_VOLTA_TEMPLATES_RESPONSE = ORJSONResponse([
+    {
+        "name": "Hager Volta 12 Way",
+        "model": "VD112",
+        "manufacturer": "Hager",
+        "rows": 2,
+        "slots_per_row": 6,
+        "voltage": 230.0,
+        "current_rating": 63.0,
+        "description": "12-way consumer unit suitable for small to medium homes - 2 rows of 6 slots each"
+    },
+    {
+        "name": "Hager Volta 18 Way",
+        "model": "VD118",
+        "manufacturer": "Hager", 
+        "rows": 2,
+        "slots_per_row": 9,
+        "voltage": 230.0,
+        "current_rating": 100.0,
+        "description": "18-way consumer unit suitable for medium to large homes - 2 rows of 9 slots each"
+    },
+    {
+        "name": "Hager Volta 24 Way",
+        "model": "VD124",
+        "manufacturer": "Hager",
+        "rows": 3,
+        "slots_per_row": 8,
+        "voltage": 230.0,
+        "current_rating": 100.0,
+        "description": "24-way consumer unit suitable for large homes or small commercial - 3 rows of 8 slots each"
+    }
+])
+
 @router.get("/templates/hager-volta")
-def get_hager_volta_templates():
+async def get_hager_volta_templates():
     """Get predefined Hager Volta panel templates"""
-    templates = [
-        {
-            "name": "Hager Volta 12 Way",
-            "model": "VD112",
-            "manufacturer": "Hager",
-            "rows": 2,
-            "slots_per_row": 6,
-            "voltage": 230.0,
-            "current_rating": 63.0,
-            "description": "12-way consumer unit suitable for small to medium homes - 2 rows of 6 slots each"
-        },
-        {
-            "name": "Hager Volta 18 Way",
-            "model": "VD118",
-            "manufacturer": "Hager", 
-            "rows": 2,
-            "slots_per_row": 9,
-            "voltage": 230.0,
-            "current_rating": 100.0,
-            "description": "18-way consumer unit suitable for medium to large homes - 2 rows of 9 slots each"
-        },
-        {
-            "name": "Hager Volta 24 Way",
-            "model": "VD124",
-            "manufacturer": "Hager",
-            "rows": 3,
-            "slots_per_row": 8,
-            "voltage": 230.0,
-            "current_rating": 100.0,
-            "description": "24-way consumer unit suitable for large homes or small commercial - 3 rows of 8 slots each"
-        }
-    ]
-    return templates
+    return HAGER_VOLTA_TEMPLATES_RESPONSE
@@ -3,15 +3,23 @@ Template Sync API Router
 Endpoints for managing template synchronization with DigiKey API
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, BackgroundTasks, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import logging
 import os
 
-from database import get_db
+from database import SessionLocal, get_db
+from models import SyncJob
 from services.digikey_client import DigiKeyAPIClient
-from services.template_sync import TemplateSyncService, demo_digikey_integration, create_initial_panel_templates
+from routers._http import not_modified
+from services.template_sync import (
+    MAX_CONCURRENT_SYNCS, TemplateSyncService, demo_digikey_integration, create_initial_panel_templates
+)
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -28,6 +36,21 @@ def get_digikey_client() -> DigiKeyAPIClient:
         _digikey_client = DigiKeyAPIClient(use_sandbox=True)
     return _digikey_client
 
+def close_digikey_client():
+    """Release the DigiKey client's pooled connections (called on app shutdown)"""
+    if _digikey_client is not None:
+        _digikey_client.close()
+
+# Global sync service, shared so its statistics accumulate across requests
+_sync_service: Optional[TemplateSyncService] = None
+
+def get_sync_service() -> TemplateSyncService:
+    """Get or create the template sync service for the shared DigiKey client"""
+    global _sync_service
+    if _sync_service is None:
+        _sync_service = TemplateSyncService(get_digikey_client())
+    return _sync_service
+
 # Request/Response Models
 class SyncRequest(BaseModel):
     manufacturers: Optional[List[str]] = ["Hager"]
@@ -40,35 +63,122 @@ class SyncResponse(BaseModel):
     status: str
     message: str
     results: Optional[Dict[str, Any]] = None
+    job_id: Optional[int] = None
 
-@router.get("/status")
-async def get_sync_status() -> Dict[str, Any]:
-    """Get current synchronization status and configuration"""
+class SyncStatus(BaseModel):
+    api_configured: bool
+    authenticated: bool
+    sandbox_mode: bool
+    sync_service_ready: bool
+    sync_stats: Dict[str, Any]
+
+class AuthUrlInfo(BaseModel):
+    authorization_url: str
+    instructions: str
+
+class CallbackResult(BaseModel):
+    authorization_code: str
+    status: str
+    message: str
+
+class ErrorDetail(BaseModel):
+    detail: Any
+
+class DiagnoseResponse(BaseModel):
+    status: SyncStatus
+    auth: Union[AuthUrlInfo, ErrorDetail]
+    callback: Union[CallbackResult, ErrorDetail]
+
+def run_sync_job(job_id: int, manufacturers: List[str], component_types: Optional[List[str]]):
+    """Sync several manufacturers concurrently and record the outcome on the sync job"""
+    def set_job(**values):
+        with SessionLocal() as db:
+            db.execute(update(SyncJob).where(SyncJob.id == job_id).values(**values))
+            db.commit()
+    
+    try:
+        sync_service = get_sync_service()
+        
+        def sync_manufacturer(manufacturer: str) -> Dict[str, Any]:
+            # Each worker thread uses its own session
+            logger.info("Starting sync for manufacturer: %s", manufacturer)
+            with SessionLocal() as db:
+                return sync_service.sync_manufacturer_components(
+                    manufacturer=manufacturer,
+                    component_types=component_types,
+                    db=db
+                )
+        
+        set_job(status="running")
+        results: Dict[str, Any] = {}
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_SYNCS) as executor:
+            futures = {manufacturer: executor.submit(sync_manufacturer, manufacturer) for manufacturer in manufacturers}
+            # One failing manufacturer must not discard the ones that synced
+            for manufacturer, future in futures.items():
+                try:
+                    results[manufacturer] = future.result()
+                except Exception as e:
+                    logger.error(f"Template sync job {job_id} failed for {manufacturer}: {e}")
+                    results[manufacturer] = {"error": str(e)}
+        
+        failed = [manufacturer for manufacturer, result in results.items() if "error" in result]
+        if not failed:
+            set_job(status="completed", results=results, finished_at=func.now())
+        elif len(failed) == len(results):
+            set_job(status="failed", results=results, error=f"All manufacturers failed: {', '.join(failed)}", finished_at=func.now())
+        else:
+            set_job(status="completed_with_errors", results=results, error=f"Failed manufacturers: {', '.join(failed)}", finished_at=func.now())
+    except Exception as e:
+        # Whatever escaped (a database error, unserializable results), the job must not stay running
+        logger.error(f"Template sync job {job_id} failed: {e}")
+        try:
+            set_job(status="failed", error=str(e), finished_at=func.now())
+        except Exception as mark_error:
+            logger.error(f"Could not mark template sync job {job_id} as failed: {mark_error}")
+
+def revalidated_json_response(content: Dict[str, Any], if_none_match: Optional[str]) -> Response:
+    """JSON response tagged with a hash of its bytes, or an empty 304 when the client already holds it"""
+    response = ORJSONResponse(content)
+    etag = f'"{hashlib.sha1(response.body).hexdigest()}"'
+    # Clients must revalidate each time: authentication and sync stats change at any moment
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    not_modified_response = not_modified(headers, if_none_match)
+    if not_modified_response is not None:
+        return not_modified_response
+    response.headers.update(headers)
+    return response
+
+def sync_status() -> Dict[str, Any]:
+    """API configuration, authentication and sync stats"""
     client = get_digikey_client()
     
     status = {
         "api_configured": client.is_configured(),
-        "authenticated": bool(client.access_token),
+        "authenticated": client.is_authenticated(),
         "sandbox_mode": client.use_sandbox,
         "sync_service_ready": False,
         "sync_stats": {}
     }
     
     if status["api_configured"] and status["authenticated"]:
-        sync_service = TemplateSyncService(client)
+        sync_service = get_sync_service()
         status["sync_service_ready"] = True
         status["sync_stats"] = sync_service.get_sync_statistics()
     
     return status
 
+@router.get("/status", response_model=SyncStatus)
+async def get_sync_status(if_none_match: Optional[str] = Header(None)) -> Response:
+    """Get current synchronization status and configuration"""
+    return revalidated_json_response(sync_status(), if_none_match)
+
 @router.get("/demo")
 async def demo_integration() -> Dict[str, Any]:
     """Demo endpoint showing DigiKey integration setup"""
     return demo_digikey_integration()
 
-@router.get("/auth-url")
-async def get_auth_url() -> Dict[str, str]:
-    """Get DigiKey OAuth authorization URL"""
+def auth_url_info() -> Dict[str, str]:
+    """The OAuth authorization URL with usage instructions; HTTPException when unavailable"""
     client = get_digikey_client()
     
     if not client.is_configured():
@@ -86,6 +196,11 @@ async def get_auth_url() -> Dict[str, str]:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate auth URL: {e}")
 
+@router.get("/auth-url", response_model=AuthUrlInfo)
+async def get_auth_url(if_none_match: Optional[str] = Header(None)) -> Response:
+    """Get DigiKey OAuth authorization URL"""
+    return revalidated_json_response(auth_url_info(), if_none_match)
+
 @router.get("/callback")
 async def oauth_callback(code: Optional[str] = None, error: Optional[str] = None):
     """Handle DigiKey OAuth callback and redirect back to frontend"""
@@ -104,9 +219,8 @@ async def oauth_callback(code: Optional[str] = None, error: Optional[str] = None
     # Redirect to frontend with the authorization code
     return RedirectResponse(url=f"{base_url}/?code={code}")
 
-@router.get("/callback-info")
-async def callback_info(code: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
-    """Alternative callback endpoint that returns JSON (for API testing)"""
+def callback_result(code: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """What the JSON callback reports for an OAuth redirect; HTTPException when it carries no code"""
     if error:
         raise HTTPException(
             status_code=400,
@@ -126,6 +240,27 @@ async def callback_info(code: Optional[str] = None, error: Optional[str] = None)
         "message": "Authorization code received successfully"
     }
 
+@router.get("/callback-info")
+async def callback_info(code: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """Alternative callback endpoint that returns JSON (for API testing)"""
+    return callback_result(code, error)
+
+@router.get("/diagnose", response_model=DiagnoseResponse)
+async def diagnose_oauth_flow(code: Optional[str] = None, if_none_match: Optional[str] = Header(None)) -> Response:
+    """The /status, /auth-url and /callback-info answers in one round trip, for OAuth flow checks.
+    A part whose endpoint would fail carries that endpoint's error body ({"detail": ...}) instead."""
+    def answer(build) -> Dict[str, Any]:
+        try:
+            return build()
+        except HTTPException as e:
+            return {"detail": e.detail}
+    
+    return revalidated_json_response({
+        "status": sync_status(),
+        "auth": answer(auth_url_info),
+        "callback": answer(lambda: callback_result(code)),
+    }, if_none_match)
+
 @router.post("/authenticate")
 async def authenticate(auth_request: AuthRequest) -> SyncResponse:
     """Authenticate with DigiKey API using authorization code"""
@@ -151,13 +286,13 @@ async def authenticate(auth_request: AuthRequest) -> SyncResponse:
             detail="Failed to authenticate with DigiKey API. Please check your authorization code."
         )
 
-@router.post("/sync")
+@router.post("/sync", status_code=202)
 async def sync_templates(
     sync_request: SyncRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ) -> SyncResponse:
-    """Synchronize device templates from DigiKey API"""
+    """Start a background sync of device templates from DigiKey API; poll /sync/jobs/{job_id} for results"""
     client = get_digikey_client()
     
     if not client.is_configured():
@@ -166,43 +301,51 @@ async def sync_templates(
             detail="DigiKey API not configured. Set DIGIKEY_CLIENT_ID and DIGIKEY_CLIENT_SECRET environment variables."
         )
     
-    if not client.access_token:
+    if not client.is_authenticated():
         raise HTTPException(
             status_code=401,
             detail="DigiKey API not authenticated. Please authenticate first using /authenticate endpoint."
         )
     
     # Validate API connection
-    sync_service = TemplateSyncService(client)
+    sync_service = get_sync_service()
     if not sync_service.validate_api_connection():
         raise HTTPException(
             status_code=503,
             detail="Cannot connect to DigiKey API. Please check your authentication."
         )
     
-    # Start synchronization
-    try:
-        results = {}
-        manufacturers = sync_request.manufacturers or ["Hager"]
-        
-        for manufacturer in manufacturers:
-            logger.info(f"Starting sync for manufacturer: {manufacturer}")
-            result = sync_service.sync_manufacturer_components(
-                manufacturer=manufacturer,
-                component_types=sync_request.component_types,
-                db=db
-            )
-            results[manufacturer] = result
-        
-        return SyncResponse(
-            status="success",
-            message=f"Synchronized templates for {len(manufacturers)} manufacturers",
-            results=results
-        )
-        
-    except Exception as e:
-        logger.error(f"Template sync failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Synchronization failed: {e}")
+    # Record the job, then sync in the background so the client is not held open
+    manufacturers = sync_request.manufacturers or ["Hager"]
+    job = SyncJob(status="pending", manufacturers=manufacturers, component_types=sync_request.component_types)
+    db.add(job)
+    db.commit()
+    
+    background_tasks.add_task(run_sync_job, job.id, manufacturers, sync_request.component_types)
+    
+    return SyncResponse(
+        status="accepted",
+        message=f"Started synchronizing templates for {len(manufacturers)} manufacturers",
+        job_id=job.id
+    )
+
+@router.get("/sync/jobs/{job_id}")
+def get_sync_job(job_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Get the status and results of a background sync job"""
+    job = db.get(SyncJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    
+    return {
+        "id": job.id,
+        "status": job.status,
+        "manufacturers": job.manufacturers,
+        "component_types": job.component_types,
+        "results": job.results,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at
+    }
 
 @router.post("/sync/{manufacturer}")
 async def sync_manufacturer_templates(
@@ -213,13 +356,13 @@ async def sync_manufacturer_templates(
     """Synchronize templates for a specific manufacturer"""
     client = get_digikey_client()
     
-    if not client.is_configured() or not client.access_token:
+    if not client.is_configured() or not client.is_authenticated():
         raise HTTPException(
             status_code=401,
             detail="DigiKey API not configured or authenticated"
         )
     
-    sync_service = TemplateSyncService(client)
+    sync_service = get_sync_service()
     
     try:
         if component_types is None:
@@ -246,10 +389,10 @@ async def get_sync_stats() -> Dict[str, Any]:
     """Get synchronization statistics"""
     client = get_digikey_client()
     
-    if not client.access_token:
+    if not client.is_authenticated():
         return {"error": "Not authenticated"}
     
-    sync_service = TemplateSyncService(client)
+    sync_service = get_sync_service()
     return sync_service.get_sync_statistics()
 
 @router.post("/init-panels")
@@ -266,11 +409,14 @@ async def initialize_panel_templates(db: Session = Depends(get_db)) -> SyncRespo
         logger.error(f"Failed to initialize panel templates: {e}")
         raise HTTPException(status_code=500, detail=f"Initialization failed: {e}")
 
+# Static, so encoded once at import and reused for every request
+SUPPORTED_MANUFACTURERS_RESPONSE = ORJSONResponse({
+    "manufacturers": ["Hager", "Schneider Electric", "ABB", "Eaton"],
+    "component_types": ["circuit_breakers", "rcd_devices", "rcbo_devices", "smart_meters", "contactors"],
+    "note": "Templates are created from DigiKey API product data"
+})
+
 @router.get("/supported-manufacturers")
-async def get_supported_manufacturers() -> Dict[str, Any]:
+async def get_supported_manufacturers() -> ORJSONResponse:
     """Get list of supported manufacturers and component types"""
-    return {
-        "manufacturers": ["Hager", "Schneider Electric", "ABB", "Eaton"],
-        "component_types": ["circuit_breakers", "rcd_devices", "rcbo_devices", "smart_meters", "contactors"],
-        "note": "Templates are created from DigiKey API product data"
-    }
\ No newline at end of file
+    return SUPPORTED_MANUFACTURERS_RESPONSE
\ No newline at end of file
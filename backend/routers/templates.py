@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
@@ -9,12 +12,24 @@ from schemas import (
     PanelTemplateUpdate,
     DeviceTemplate as DeviceTemplateSchema,
     DeviceTemplateCreate,
-    DeviceTemplateUpdate,
-    DeviceTemplateWithInstances
+    DeviceTemplateUpdate
 )
+from services.template_cache import invalidate_template_info
+from routers._http import update_returning
 
 router = APIRouter()
 
+# List endpoints build schemas from the trusted rows without validation and encode the whole
+# list in one pass; returning a Response skips FastAPI's own per-item validation
+# (response_model still documents the shape)
+PANEL_TEMPLATE_LIST = TypeAdapter(List[PanelTemplateSchema])
+DEVICE_TEMPLATE_LIST = TypeAdapter(List[DeviceTemplateSchema])
+
+def duplicate_model_error(db: Session, kind: str) -> HTTPException:
+    """Roll back a write that hit the unique (manufacturer, model) index and report the conflict"""
+    db.rollback()
+    return HTTPException(status_code=409, detail=f"A {kind} with this manufacturer and model already exists")
+
 # Panel Template endpoints
 @router.get("/panel-templates", response_model=List[PanelTemplateSchema])
 def get_panel_templates(
@@ -35,7 +50,8 @@ def get_panel_templates(
     if series:
         query = query.filter(PanelTemplate.series.ilike(f"%{series}%"))
     
-    return query.all()
+    templates = [PanelTemplateSchema.from_orm_fast(template) for template in query.all()]
+    return Response(PANEL_TEMPLATE_LIST.dump_json(templates), media_type="application/json")
 
 @router.get("/panel-templates/{template_id}", response_model=PanelTemplateSchema)
 def get_panel_template(template_id: int, db: Session = Depends(get_db)):
@@ -50,7 +66,10 @@ def create_panel_template(template: PanelTemplateCreate, db: Session = Depends(g
     """Create a new panel template"""
     db_template = PanelTemplate(**template.model_dump())
     db.add(db_template)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        raise duplicate_model_error(db, "panel template")
     db.refresh(db_template)
     return db_template
 
@@ -61,26 +80,22 @@ def update_panel_template(
     db: Session = Depends(get_db)
 ):
     """Update a panel template"""
-    db_template = db.query(PanelTemplate).filter(PanelTemplate.id == template_id).first()
-    if not db_template:
-        raise HTTPException(status_code=404, detail="Panel template not found")
-    
     update_data = template.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_template, field, value)
-    
-    db.commit()
-    db.refresh(db_template)
-    return db_template
+    try:
+        panel_template = update_returning(
+            db, PanelTemplate, template_id, update_data, PanelTemplateSchema, "Panel template not found"
+        )
+    except IntegrityError:
+        raise duplicate_model_error(db, "panel template")
+    return panel_template
 
 @router.delete("/panel-templates/{template_id}")
 def delete_panel_template(template_id: int, db: Session = Depends(get_db)):
     """Soft delete a panel template (mark as inactive)"""
-    db_template = db.query(PanelTemplate).filter(PanelTemplate.id == template_id).first()
-    if not db_template:
+    result = db.execute(update(PanelTemplate).where(PanelTemplate.id == template_id).values(is_active=False))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Panel template not found")
     
-    setattr(db_template, 'is_active', False)
     db.commit()
     return {"message": "Panel template deactivated"}
 
@@ -112,7 +127,8 @@ def get_device_templates(
     if category:
         query = query.filter(DeviceTemplate.category.ilike(f"%{category}%"))
     
-    return query.all()
+    templates = [DeviceTemplateSchema.from_orm_fast(template) for template in query.all()]
+    return Response(DEVICE_TEMPLATE_LIST.dump_json(templates), media_type="application/json")
 
 @router.get("/device-templates/{template_id}", response_model=DeviceTemplateSchema)
 def get_device_template(template_id: int, db: Session = Depends(get_db)):
@@ -127,7 +143,10 @@ def create_device_template(template: DeviceTemplateCreate, db: Session = Depends
     """Create a new device template"""
     db_template = DeviceTemplate(**template.model_dump())
     db.add(db_template)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        raise duplicate_model_error(db, "device template")
     db.refresh(db_template)
     return db_template
 
@@ -138,26 +157,23 @@ def update_device_template(
     db: Session = Depends(get_db)
 ):
     """Update a device template"""
-    db_template = db.query(DeviceTemplate).filter(DeviceTemplate.id == template_id).first()
-    if not db_template:
-        raise HTTPException(status_code=404, detail="Device template not found")
-    
     update_data = template.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_template, field, value)
-    
-    db.commit()
-    db.refresh(db_template)
-    return db_template
+    try:
+        device_template = update_returning(
+            db, DeviceTemplate, template_id, update_data, DeviceTemplateSchema, "Device template not found"
+        )
+    except IntegrityError:
+        raise duplicate_model_error(db, "device template")
+    invalidate_template_info(template_id)
+    return device_template
 
 @router.delete("/device-templates/{template_id}")
 def delete_device_template(template_id: int, db: Session = Depends(get_db)):
     """Soft delete a device template (mark as inactive)"""
-    db_template = db.query(DeviceTemplate).filter(DeviceTemplate.id == template_id).first()
-    if not db_template:
+    result = db.execute(update(DeviceTemplate).where(DeviceTemplate.id == template_id).values(is_active=False))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Device template not found")
     
-    setattr(db_template, 'is_active', False)
     db.commit()
     return {"message": "Device template deactivated"}
 
@@ -166,38 +182,48 @@ def delete_device_template(template_id: int, db: Session = Depends(get_db)):
 def get_device_library(
     manufacturer: str = "hager",
     category: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
     """Get device templates for the component library"""
-    query = db.query(DeviceTemplate).filter(
-        DeviceTemplate.manufacturer.ilike(f"%{manufacturer}%"),
-        DeviceTemplate.is_active == True
+    def library_query(manufacturer_filter):
+        query = db.query(DeviceTemplate).filter(manufacturer_filter, DeviceTemplate.is_active == True)
+        if category:
+            query = query.filter(DeviceTemplate.category.ilike(f"%{category}%"))
+        
+        # Order by category and name for consistent display
+        return query.order_by(DeviceTemplate.category, DeviceTemplate.name).limit(limit).all()
+    
+    # Library browsing passes full manufacturer names, which ix_devtpl_library serves pre-sorted;
+    # anything else falls back to a substring match
+    rows = (
+        library_query(func.lower(DeviceTemplate.manufacturer) == manufacturer.lower())
+        or library_query(DeviceTemplate.manufacturer.ilike(f"%{manufacturer}%"))
     )
-    
-    if category:
-        query = query.filter(DeviceTemplate.category.ilike(f"%{category}%"))
-    
-    # Order by category and name for consistent display
-    query = query.order_by(DeviceTemplate.category, DeviceTemplate.name)
-    
-    return query.all()
+    templates = [DeviceTemplateSchema.from_orm_fast(template) for template in rows]
+    return Response(DEVICE_TEMPLATE_LIST.dump_json(templates), media_type="application/json")
 
 @router.get("/library/panels/{manufacturer}", response_model=List[PanelTemplateSchema])
 def get_panel_library(
     manufacturer: str = "hager",
     series: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
     """Get panel templates for the component library"""
-    query = db.query(PanelTemplate).filter(
-        PanelTemplate.manufacturer.ilike(f"%{manufacturer}%"),
-        PanelTemplate.is_active == True
+    def library_query(manufacturer_filter):
+        query = db.query(PanelTemplate).filter(manufacturer_filter, PanelTemplate.is_active == True)
+        if series:
+            query = query.filter(PanelTemplate.series.ilike(f"%{series}%"))
+        
+        # Order by series and slots for consistent display
+        return query.order_by(PanelTemplate.series, PanelTemplate.total_slots).limit(limit).all()
+    
+    # Library browsing passes full manufacturer names, which ix_paneltpl_library serves pre-sorted;
+    # anything else falls back to a substring match
+    rows = (
+        library_query(func.lower(PanelTemplate.manufacturer) == manufacturer.lower())
+        or library_query(PanelTemplate.manufacturer.ilike(f"%{manufacturer}%"))
     )
-    
-    if series:
-        query = query.filter(PanelTemplate.series.ilike(f"%{series}%"))
-    
-    # Order by series and slots for consistent display
-    query = query.order_by(PanelTemplate.series, PanelTemplate.total_slots)
-    
-    return query.all()
\ No newline at end of file
+    templates = [PanelTemplateSchema.from_orm_fast(template) for template in rows]
+    return Response(PANEL_TEMPLATE_LIST.dump_json(templates), media_type="application/json")
\ No newline at end of file
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, exists, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models import Wire, Panel, PanelSlot
 from schemas import Wire as WireSchema, WireCreate, WireUpdate
+from routers._http import not_modified, update_returning
 
 router = APIRouter()
 
+# Wires are built from the trusted rows without validation and encoded in one pass
+WIRE_LIST = TypeAdapter(List[WireSchema])
+
 @router.get("/panel/{panel_id}", response_model=List[WireSchema])
 def get_panel_wiring(panel_id: int, db: Session = Depends(get_db)):
     """Get all wiring for a specific panel"""
@@ -14,8 +22,8 @@ def get_panel_wiring(panel_id: int, db: Session = Depends(get_db)):
     if not panel:
         raise HTTPException(status_code=404, detail="Panel not found")
     
-    wires = db.query(Wire).filter(Wire.panel_id == panel_id).all()
-    return wires
+    wires = [WireSchema.from_orm_fast(wire) for wire in db.query(Wire).filter(Wire.panel_id == panel_id)]
+    return Response(WIRE_LIST.dump_json(wires), media_type="application/json")
 
 @router.get("/{wire_id}", response_model=WireSchema)
 def get_wire(wire_id: int, db: Session = Depends(get_db)):
@@ -28,23 +36,22 @@ def get_wire(wire_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=WireSchema)
 def create_wire(wire: WireCreate, db: Session = Depends(get_db)):
     """Create a new wire connection"""
-    # Validate panel exists
-    panel = db.query(Panel).filter(Panel.id == wire.panel_id).first()
-    if not panel:
+    # Validate the panel and any specified slots exist, all in one round-trip
+    panel_found, source_found, dest_found = db.execute(select(
+        exists().where(Panel.id == wire.panel_id),
+        exists().where(PanelSlot.id == wire.source_slot_id),
+        exists().where(PanelSlot.id == wire.destination_slot_id)
+    )).one()
+    if not panel_found:
         raise HTTPException(status_code=404, detail="Panel not found")
     
-    # Validate slots exist if specified
-    if wire.source_slot_id:
-        source_slot = db.query(PanelSlot).filter(PanelSlot.id == wire.source_slot_id).first()
-        if not source_slot:
-            raise HTTPException(status_code=404, detail="Source slot not found")
+    if wire.source_slot_id and not source_found:
+        raise HTTPException(status_code=404, detail="Source slot not found")
     
-    if wire.destination_slot_id:
-        dest_slot = db.query(PanelSlot).filter(PanelSlot.id == wire.destination_slot_id).first()
-        if not dest_slot:
-            raise HTTPException(status_code=404, detail="Destination slot not found")
+    if wire.destination_slot_id and not dest_found:
+        raise HTTPException(status_code=404, detail="Destination slot not found")
     
-    db_wire = Wire(**wire.dict())
+    db_wire = Wire(**wire.model_dump())
     db.add(db_wire)
     db.commit()
     db.refresh(db_wire)
@@ -53,60 +60,69 @@ def create_wire(wire: WireCreate, db: Session = Depends(get_db)):
 @router.put("/{wire_id}", response_model=WireSchema)
 def update_wire(wire_id: int, wire_update: WireUpdate, db: Session = Depends(get_db)):
     """Update a wire connection"""
-    db_wire = db.query(Wire).filter(Wire.id == wire_id).first()
-    if not db_wire:
-        raise HTTPException(status_code=404, detail="Wire not found")
-    
-    for field, value in wire_update.dict(exclude_unset=True).items():
-        setattr(db_wire, field, value)
-    
-    db.commit()
-    db.refresh(db_wire)
-    return db_wire
+    update_data = wire_update.model_dump(exclude_unset=True)
+    return update_returning(db, Wire, wire_id, update_data, WireSchema, "Wire not found")
 
 @router.delete("/{wire_id}")
 def delete_wire(wire_id: int, db: Session = Depends(get_db)):
     """Delete a wire connection"""
-    db_wire = db.query(Wire).filter(Wire.id == wire_id).first()
-    if not db_wire:
+    result = db.execute(delete(Wire).where(Wire.id == wire_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Wire not found")
     
-    db.delete(db_wire)
     db.commit()
     return {"message": "Wire deleted successfully"}
 
+# Wiring standards only change with a deploy, so clients may cache them for a day
+STANDARDS_CACHE_CONTROL = "public, max-age=86400"
+
+def static_json_response(content) -> ORJSONResponse:
+    """Encode a static payload once, tagged with a hash of its bytes"""
+    response = ORJSONResponse(content)
+    response.headers["ETag"] = f'"{hashlib.sha1(response.body).hexdigest()}"'
+    response.headers["Cache-Control"] = STANDARDS_CACHE_CONTROL
+    return response
+
+def static_or_not_modified(response: ORJSONResponse, if_none_match: Optional[str]) -> Response:
+    """Return the prebuilt response, or an empty 304 when the client already holds it"""
+    headers = {"ETag": response.headers["ETag"], "Cache-Control": STANDARDS_CACHE_CONTROL}
+    return not_modified(headers, if_none_match) or response
+
+# Wiring standards are static, so they are encoded once at import and reused for every request
+WIRE_COLOR_STANDARDS_RESPONSE = static_json_response({
+    "UK": {
+        "Live": ["Brown", "Black", "Grey"],
+        "Neutral": ["Blue"],
+        "Earth": ["Green/Yellow"],
+        "Switched Live": ["Brown", "Black", "Grey"]
+    },
+    "EU": {
+        "Live": ["Brown", "Black", "Grey"], 
+        "Neutral": ["Blue"],
+        "Earth": ["Green/Yellow"],
+        "Switched Live": ["Brown", "Black", "Grey"]
+    }
+})
+
+WIRE_CROSS_SECTION_STANDARDS_RESPONSE = static_json_response({
+    "domestic": [
+        {"current": "6A", "cross_section": 1.0, "typical_use": "Lighting circuits"},
+        {"current": "10A", "cross_section": 1.5, "typical_use": "Lighting circuits"},
+        {"current": "16A", "cross_section": 2.5, "typical_use": "Socket outlets"},
+        {"current": "20A", "cross_section": 2.5, "typical_use": "Socket outlets, small appliances"},
+        {"current": "25A", "cross_section": 4.0, "typical_use": "Kitchen appliances"},
+        {"current": "32A", "cross_section": 6.0, "typical_use": "Cooker, large appliances"},
+        {"current": "40A", "cross_section": 10.0, "typical_use": "Electric shower, main feeds"},
+        {"current": "50A", "cross_section": 16.0, "typical_use": "Main incoming supply"}
+    ]
+})
+
 @router.get("/standards/colors")
-def get_wire_color_standards():
+async def get_wire_color_standards(if_none_match: Optional[str] = Header(None)):
     """Get standard wire colors for different types"""
-    standards = {
-        "UK": {
-            "Live": ["Brown", "Black", "Grey"],
-            "Neutral": ["Blue"],
-            "Earth": ["Green/Yellow"],
-            "Switched Live": ["Brown", "Black", "Grey"]
-        },
-        "EU": {
-            "Live": ["Brown", "Black", "Grey"], 
-            "Neutral": ["Blue"],
-            "Earth": ["Green/Yellow"],
-            "Switched Live": ["Brown", "Black", "Grey"]
-        }
-    }
-    return standards
+    return static_or_not_modified(WIRE_COLOR_STANDARDS_RESPONSE, if_none_match)
 
 @router.get("/standards/cross-sections")
-def get_wire_cross_section_standards():
+async def get_wire_cross_section_standards(if_none_match: Optional[str] = Header(None)):
     """Get standard wire cross-sections for different currents"""
-    standards = {
-        "domestic": [
-            {"current": "6A", "cross_section": 1.0, "typical_use": "Lighting circuits"},
-            {"current": "10A", "cross_section": 1.5, "typical_use": "Lighting circuits"},
-            {"current": "16A", "cross_section": 2.5, "typical_use": "Socket outlets"},
-            {"current": "20A", "cross_section": 2.5, "typical_use": "Socket outlets, small appliances"},
-            {"current": "25A", "cross_section": 4.0, "typical_use": "Kitchen appliances"},
-            {"current": "32A", "cross_section": 6.0, "typical_use": "Cooker, large appliances"},
-            {"current": "40A", "cross_section": 10.0, "typical_use": "Electric shower, main feeds"},
-            {"current": "50A", "cross_section": 16.0, "typical_use": "Main incoming supply"}
-        ]
-    }
-    return standards
+    return static_or_not_modified(WIRE_CROSS_SECTION_STANDARDS_RESPONSE, if_none_match)
@@ -1,7 +1,45 @@
-from pydantic import BaseModel, computed_field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, create_model
+from typing import Optional, List, Dict, Any, ClassVar, Type, Union
 from datetime import datetime
 
+# Values accepted by the JSON-typed features/custom_properties columns
+JSONValue = Union[Dict[str, Any], List[Any], str]
+
+# Shared by every schema read from ORM rows
+ORM_CONFIG = ConfigDict(from_attributes=True)
+# For nested schemas no endpoint returns yet: built on first use rather than at import
+DEFERRED_ORM_CONFIG = ConfigDict(from_attributes=True, defer_build=True)
+
+# Partial updates apply only the fields the client sent (model_dump(exclude_unset=True)
+# or model_fields_set); a misspelled field is rejected rather than silently ignored
+PARTIAL_UPDATE_CONFIG = ConfigDict(extra="forbid")
+
+def partial_model(name: str, base: Type[BaseModel], config: Optional[ConfigDict] = None) -> Type[BaseModel]:
+    """Partial-update schema with every field of base made optional, defaulting to unset"""
+    fields = {field: (Optional[info.annotation], None) for field, info in base.model_fields.items()}
+    return create_model(name, __config__=config, __module__=__name__, **fields)
+
+class ORMReadModel(BaseModel):
+    """Response schema that can also be built from a loaded ORM row without validation"""
+    # Relationship fields and the schema their loaded rows are built with
+    orm_relationships: ClassVar[Dict[str, type]] = {}
+    
+    model_config = ORM_CONFIG
+    
+    @classmethod
+    def from_orm_fast(cls, obj):
+        """Build from trusted database data, skipping validation. Only attributes already
+        loaded on obj are read, so nothing lazy-loads; unloaded fields take their defaults."""
+        loaded = obj.__dict__
+        data = {name: loaded[name] for name in cls.model_fields if name in loaded}
+        for name, schema in cls.orm_relationships.items():
+            value = data.get(name)
+            if isinstance(value, list):
+                data[name] = [schema.from_orm_fast(item) for item in value]
+            elif value is not None:
+                data[name] = schema.from_orm_fast(value)
+        return cls.model_construct(**data)
+
 # Panel Template Schemas
 class PanelTemplateBase(BaseModel):
     name: str
@@ -16,36 +54,16 @@ class PanelTemplateBase(BaseModel):
     protection_rating: Optional[str] = None
     description: Optional[str] = None
     is_active: bool = True
-    
-    @computed_field
-    @property
-    def total_slots(self) -> int:
-        return self.rows * self.slots_per_row
 
-class PanelTemplateCreate(PanelTemplateBase):
-    pass
+# Create and update payloads reuse the base field list, so no separate schema is maintained
+PanelTemplateCreate = PanelTemplateBase
+PanelTemplateUpdate = partial_model("PanelTemplateUpdate", PanelTemplateBase, PARTIAL_UPDATE_CONFIG)
 
-class PanelTemplateUpdate(BaseModel):
-    name: Optional[str] = None
-    model: Optional[str] = None
-    manufacturer: Optional[str] = None
-    series: Optional[str] = None
-    rows: Optional[int] = None
-    slots_per_row: Optional[int] = None
-    voltage: Optional[float] = None
-    max_current: Optional[float] = None
-    enclosure_type: Optional[str] = None
-    protection_rating: Optional[str] = None
-    description: Optional[str] = None
-    is_active: Optional[bool] = None
-
-class PanelTemplate(PanelTemplateBase):
+class PanelTemplate(PanelTemplateBase, ORMReadModel):
     id: int
+    total_slots: int  # Generated column (rows * slots_per_row)
     created_at: datetime
     updated_at: Optional[datetime] = None
-    
-    class Config:
-        from_attributes = True
 
 # Device Template Schemas
 class DeviceTemplateBase(BaseModel):
@@ -65,41 +83,17 @@ class DeviceTemplateBase(BaseModel):
     pole_count: Optional[int] = None
     width_in_modules: float = 1.0
     mounting_type: Optional[str] = None
-    features: Optional[str] = None
+    features: Optional[JSONValue] = None
     description: Optional[str] = None
     is_active: bool = True
 
-class DeviceTemplateCreate(DeviceTemplateBase):
-    pass
+DeviceTemplateCreate = DeviceTemplateBase
+DeviceTemplateUpdate = partial_model("DeviceTemplateUpdate", DeviceTemplateBase, PARTIAL_UPDATE_CONFIG)
 
-class DeviceTemplateUpdate(BaseModel):
-    name: Optional[str] = None
-    model: Optional[str] = None
-    manufacturer: Optional[str] = None
-    series: Optional[str] = None
-    device_type: Optional[str] = None
-    category: Optional[str] = None
-    slots_required: Optional[int] = None
-    rated_current: Optional[float] = None
-    max_current: Optional[float] = None
-    voltage_range: Optional[str] = None
-    breaking_capacity: Optional[float] = None
-    sensitivity: Optional[float] = None
-    curve_type: Optional[str] = None
-    pole_count: Optional[int] = None
-    width_in_modules: Optional[float] = None
-    mounting_type: Optional[str] = None
-    features: Optional[str] = None
-    description: Optional[str] = None
-    is_active: Optional[bool] = None
-
-class DeviceTemplate(DeviceTemplateBase):
+class DeviceTemplate(DeviceTemplateBase, ORMReadModel):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    
-    class Config:
-        from_attributes = True
 
 # Panel Schemas (Updated to use templates)
 class PanelBase(BaseModel):
@@ -109,44 +103,16 @@ class PanelBase(BaseModel):
     installation_date: Optional[datetime] = None
     description: Optional[str] = None
 
-class PanelCreate(PanelBase):
-    pass
+PanelCreate = PanelBase
+PanelUpdate = partial_model("PanelUpdate", PanelBase)
 
-class PanelUpdate(BaseModel):
-    name: Optional[str] = None
-    template_id: Optional[int] = None
-    location: Optional[str] = None
-    installation_date: Optional[datetime] = None
-    description: Optional[str] = None
-
-class Panel(PanelBase):
+class Panel(PanelBase, ORMReadModel):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
     template: Optional[PanelTemplate] = None
     
-    class Config:
-        from_attributes = True
-
-# Device Type Schemas (Legacy - to be phased out)
-class DeviceTypeBase(BaseModel):
-    name: str
-    category: str
-    manufacturer: str
-    model: str
-    slots_required: int = 1
-    max_current: Optional[float] = None
-    voltage_range: Optional[str] = None
-    description: Optional[str] = None
-
-class DeviceTypeCreate(DeviceTypeBase):
-    pass
-
-class DeviceType(DeviceTypeBase):
-    id: int
-    
-    class Config:
-        from_attributes = True
+    orm_relationships = {"template": PanelTemplate}
 
 # Panel Slot Schemas (Updated to use templates)
 class PanelSlotBase(BaseModel):
@@ -155,7 +121,7 @@ class PanelSlotBase(BaseModel):
     column: int
     device_label: Optional[str] = None
     current_setting: Optional[float] = None
-    custom_properties: Optional[str] = None
+    custom_properties: Optional[JSONValue] = None
     spans_slots: int = 1
     installed_date: Optional[datetime] = None
 
@@ -167,19 +133,42 @@ class PanelSlotUpdate(BaseModel):
     device_template_id: Optional[int] = None
     device_label: Optional[str] = None
     current_setting: Optional[float] = None
-    custom_properties: Optional[str] = None
+    custom_properties: Optional[JSONValue] = None
     spans_slots: Optional[int] = None
     installed_date: Optional[datetime] = None
+    
+    model_config = PARTIAL_UPDATE_CONFIG
 
-class PanelSlot(PanelSlotBase):
+class PanelSlot(PanelSlotBase, ORMReadModel):
     id: int
     panel_id: int
     device_template_id: Optional[int] = None
     is_occupied: bool
     device_template: Optional[DeviceTemplate] = None
     
-    class Config:
-        from_attributes = True
+    orm_relationships = {"device_template": DeviceTemplate}
+
+# Device Placement Schemas (read straight from the ORM rows)
+class PlacementSlotInfo(BaseModel):
+    id: Optional[int] = None
+    row: Optional[int] = None
+    column: Optional[int] = None
+    is_occupied: Optional[bool] = None
+    spans_slots: Optional[int] = None
+    
+    model_config = ORM_CONFIG
+
+class PlacementDeviceInfo(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    slots_required: Optional[int] = None
+    
+    model_config = ORM_CONFIG
+
+class DevicePlacementCheck(BaseModel):
+    can_place: bool
+    slot_info: PlacementSlotInfo
+    device_info: PlacementDeviceInfo
 
 # Wire Schemas
 class WireBase(BaseModel):
@@ -207,23 +196,35 @@ class WireUpdate(BaseModel):
     external_destination: Optional[str] = None
     length: Optional[float] = None
 
-class Wire(WireBase):
+class Wire(WireBase, ORMReadModel):
     id: int
     panel_id: int
     source_slot_id: Optional[int] = None
     destination_slot_id: Optional[int] = None
-    
-    class Config:
-        from_attributes = True
+
+# Keyset-paginated panel list; next is the after_id for the following page
+class PanelPage(BaseModel):
+    items: List[Panel]
+    next: Optional[int] = None
 
 # Extended schemas with relationships
 class PanelWithSlots(Panel):
     slots: List[PanelSlot] = []
+    
+    orm_relationships = {"template": PanelTemplate, "slots": PanelSlot}
 
 class PanelSlotWithWires(PanelSlot):
     input_wires: List[Wire] = []
     output_wires: List[Wire] = []
+    
+    orm_relationships = {"device_template": DeviceTemplate, "input_wires": Wire, "output_wires": Wire}
+    
+    model_config = DEFERRED_ORM_CONFIG
 
 # Template library schemas (for API responses)
 class DeviceTemplateWithInstances(DeviceTemplate):
     device_instances: List[PanelSlot] = []
+    
+    orm_relationships = {"device_instances": PanelSlot}
+    
+    model_config = DEFERRED_ORM_CONFIG
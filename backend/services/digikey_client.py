@@ -3,13 +3,20 @@ DigiKey API Client
 Handles authentication, rate limiting, and API requests to DigiKey
 """
 
-import os
 import time
-import re
+import random
 import logging
+import threading
+from functools import lru_cache
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
-import json
+from urllib.parse import urlencode
+
+# orjson parses the large product payloads several times faster than the stdlib
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # Import requests with fallback for development
 try:
@@ -21,97 +28,172 @@ except ImportError:
     REQUESTS_AVAILABLE = False
     # Mock classes for development without requests
     class HTTPAdapter:
-        def __init__(self, max_retries=None): pass
+        def __init__(self, pool_connections=10, pool_maxsize=10, max_retries=None, pool_block=False): pass
     class Retry:
-        def __init__(self, total=3, backoff_factor=1, status_forcelist=None): pass
+        def __init__(self, total=3, backoff_factor=1, backoff_jitter=0.0, status_forcelist=None): pass
     class requests:
         class Session:
+            def __init__(self): self.headers = {}
             def mount(self, prefix, adapter): pass
+            def close(self): pass
             def post(self, url, data=None, headers=None): pass
             def request(self, method, url, headers=None, **kwargs): pass
         class RequestException(Exception): pass
 
+from config import settings
 from .digikey_config import (
     DIGIKEY_SANDBOX_URL, DIGIKEY_AUTH_URL, API_VERSION, PRODUCT_INFO_VERSION,
-    DEFAULT_HEADERS, RATE_LIMIT_PER_MINUTE, RATE_LIMIT_PER_DAY,
-    ELECTRICAL_CATEGORIES, CURRENT_RATING_PATTERNS, VOLTAGE_RATING_PATTERNS, POLE_COUNT_PATTERNS
+    DEFAULT_HEADERS, RATE_LIMIT_PER_MINUTE, RATE_LIMIT_PER_DAY, MAX_RATE_LIMIT_RETRIES,
+    BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE,
+    ELECTRICAL_CATEGORIES, SPECIFICATION_PATTERN, PARAMETER_NUMBER_PATTERN
 )
 
 logger = logging.getLogger(__name__)
 
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Frontend callback route; the token exchange must repeat the authorize request's value
+OAUTH_REDIRECT_URI = 'https://localhost:3000/template-sync/callback'
+# Fixed fields of the token exchange form; only the code and credentials vary
+TOKEN_DATA_TEMPLATE = {
+    'grant_type': 'authorization_code',
+    'redirect_uri': OAUTH_REDIRECT_URI,
+}
+TOKEN_REQUEST_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+@lru_cache(maxsize=1024)
+def parameter_spec_key(param_name: str) -> Optional[str]:
+    """Spec key filled by a DigiKey product parameter, if any. DigiKey names vary
+    ("Current Rating (Amps)"), so names are matched by keyword; the same few names
+    repeat across products, so each is classified once."""
+    name = param_name.lower()
+    if "current" in name and "rating" in name:
+        return "current_rating"
+    if "voltage" in name:
+        return "voltage_rating"
+    if "pole" in name or "way" in name:
+        return "pole_count"
+    return None
+
 
 class DigiKeyRateLimiter:
-    """Rate limiting for DigiKey API calls"""
+    """Token-bucket rate limiting for DigiKey API calls, shared by concurrent sync threads"""
+    
+    # One long-lived instance per worker, consulted on every API call
+    __slots__ = (
+        "requests_per_minute", "requests_per_day", "tokens", "refill_rate", "last_refill",
+        "paused_until", "daily_requests", "daily_reset_time", "_lock",
+    )
     
     def __init__(self, requests_per_minute: int = RATE_LIMIT_PER_MINUTE, requests_per_day: int = RATE_LIMIT_PER_DAY):
         self.requests_per_minute = requests_per_minute
         self.requests_per_day = requests_per_day
-        self.minute_requests = []
+        self.tokens = float(requests_per_minute)
+        self.refill_rate = requests_per_minute / 60.0  # Tokens per second
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
         self.daily_requests = 0
-        self.daily_reset_time = datetime.now() + timedelta(days=1)
+        self.daily_reset_time = time.monotonic() + SECONDS_PER_DAY
+        self._lock = threading.Lock()
     
-    def can_make_request(self) -> bool:
-        """Check if we can make a request within rate limits"""
-        now = datetime.now()
-        
-        # Reset daily counter if needed
+    def _refill(self, now: float):
+        self.tokens = min(self.requests_per_minute, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+    
+    def _reset_daily(self, now: float):
         if now > self.daily_reset_time:
             self.daily_requests = 0
-            self.daily_reset_time = now + timedelta(days=1)
-        
-        # Clean old minute requests
-        cutoff = now - timedelta(minutes=1)
-        self.minute_requests = [req_time for req_time in self.minute_requests if req_time > cutoff]
-        
-        # Check limits
-        minute_ok = len(self.minute_requests) < self.requests_per_minute
-        daily_ok = self.daily_requests < self.requests_per_day
-        
-        return minute_ok and daily_ok
+            self.daily_reset_time = now + SECONDS_PER_DAY
     
-    def record_request(self):
-        """Record that a request was made"""
-        self.minute_requests.append(datetime.now())
-        self.daily_requests += 1
+    def acquire(self) -> bool:
+        """Block until a request may be made and take its token. False once the daily budget is spent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._reset_daily(now)
+                if self.daily_requests >= self.requests_per_day:
+                    return False
+                self._refill(now)
+                if self.tokens >= 1 and now >= self.paused_until:
+                    self.tokens -= 1
+                    self.daily_requests += 1
+                    return True
+                wait_seconds = max((1 - self.tokens) / self.refill_rate, self.paused_until - now)
+            time.sleep(wait_seconds)
     
-    def wait_time(self) -> int:
-        """Get seconds to wait before next request"""
-        if not self.minute_requests:
-            return 0
-        
-        oldest_request = min(self.minute_requests)
-        wait_until = oldest_request + timedelta(minutes=1)
-        wait_seconds = max(0, (wait_until - datetime.now()).total_seconds())
-        return int(wait_seconds) + 1
+    def pause(self, seconds: float):
+        """Hold back every caller for the given number of seconds (e.g. after a 429)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+    
+    def update_from_headers(self, headers):
+        """Never assume more budget than DigiKey reports in X-RateLimit-Remaining"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        try:
+            remaining = float(remaining)
+        except ValueError:
+            return
+        with self._lock:
+            self.tokens = min(self.tokens, remaining)
 
 
 class DigiKeyAPIClient:
     """DigiKey API Client with OAuth 2.0 authentication and rate limiting"""
     
+    __slots__ = (
+        "client_id", "client_secret", "use_sandbox", "base_url", "access_token", "token_expires_at",
+        "_configured", "_token_valid_until", "_search_url", "_product_detail_prefix", "rate_limiter", "session",
+    )
+    
     def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, use_sandbox: bool = True):
-        self.client_id = client_id or os.getenv('DIGIKEY_CLIENT_ID')
-        self.client_secret = client_secret or os.getenv('DIGIKEY_CLIENT_SECRET')
+        self.client_id = client_id or settings.digikey_client_id
+        self.client_secret = client_secret or settings.digikey_client_secret
         self.use_sandbox = use_sandbox
         self.base_url = DIGIKEY_SANDBOX_URL if use_sandbox else "https://api.digikey.com"
+        # Product Information API URLs, built once
+        self._search_url = f"{self.base_url}/Search/{PRODUCT_INFO_VERSION}/Products/Keyword"
+        self._product_detail_prefix = f"{self.base_url}/Search/{PRODUCT_INFO_VERSION}/Products/"
         
         self.access_token = None
         self.token_expires_at = None
+        self._configured = bool(self.client_id and self.client_secret)
+        self._token_valid_until = 0.0  # time.monotonic() deadline of the access token
         self.rate_limiter = DigiKeyRateLimiter()
         
-        # Setup session with retries
+        # One pooled keep-alive session for the lifetime of the client; 429s are
+        # handled in _make_api_request so the shared rate limiter sees them
         self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
         retry_strategy = Retry(
             total=3,
             backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
+            backoff_jitter=BACKOFF_BASE_SECONDS,
+            status_forcelist=[500, 502, 503, 504],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_CONNECTIONS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=retry_strategy,
+            # Concurrent searches wait for a free connection instead of opening throwaway ones
+            pool_block=True,
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
     
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+    
     def is_configured(self) -> bool:
         """Check if API credentials are configured"""
-        return bool(self.client_id and self.client_secret)
+        return self._configured
+    
+    def is_authenticated(self) -> bool:
+        """Check for an access token that has not expired yet"""
+        return self.access_token is not None and time.monotonic() < self._token_valid_until
     
     def get_oauth_url(self) -> str:
         """Get OAuth authorization URL for manual authentication"""
@@ -125,14 +207,13 @@ class DigiKeyAPIClient:
         params = {
             'response_type': 'code',
             'client_id': self.client_id,
-            'redirect_uri': 'https://localhost:3000/template-sync/callback',  # Frontend callback route
+            'redirect_uri': OAUTH_REDIRECT_URI,
         }
         
-        from urllib.parse import urlencode
         query_string = urlencode(params)
         auth_url = f"{auth_base_url}/v1/oauth2/authorize?{query_string}"
         
-        logger.info(f"Generated OAuth URL for {'sandbox' if self.use_sandbox else 'production'}: {auth_url}")
+        logger.info("Generated OAuth URL for %s: %s", "sandbox" if self.use_sandbox else "production", auth_url)
         return auth_url
     
     def authenticate_with_code(self, authorization_code: str) -> bool:
@@ -142,70 +223,75 @@ class DigiKeyAPIClient:
             return False
         
         token_data = {
-            'grant_type': 'authorization_code',
+            **TOKEN_DATA_TEMPLATE,
             'code': authorization_code,
             'client_id': self.client_id,
             'client_secret': self.client_secret,
-            'redirect_uri': 'https://localhost:3000/template-sync/callback'  # Must match authorization request
         }
         
         try:
             response = self.session.post(
                 f"{self.base_url}/v1/oauth2/token",
                 data=token_data,
-                headers={'Content-Type': 'application/x-www-form-urlencoded'}
+                headers=TOKEN_REQUEST_HEADERS
             )
             response.raise_for_status()
             
-            token_response = response.json()
+            token_response = json_loads(response.content)
             self.access_token = token_response.get('access_token')
+            # Every later API call reuses the session headers
+            self.session.headers['Authorization'] = f'Bearer {self.access_token}'
             expires_in = token_response.get('expires_in', 3600)
             self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+            self._token_valid_until = time.monotonic() + expires_in
             
             logger.info("Successfully authenticated with DigiKey API")
             return True
             
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             logger.error(f"Failed to authenticate with DigiKey API: {e}")
             return False
     
-    def _wait_for_rate_limit(self):
-        """Wait if necessary to respect rate limits"""
-        if not self.rate_limiter.can_make_request():
-            wait_time = self.rate_limiter.wait_time()
-            if wait_time > 0:
-                logger.info(f"Rate limit reached, waiting {wait_time} seconds...")
-                time.sleep(wait_time)
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Seconds to back off after a 429: Retry-After when given, else exponential with full jitter"""
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
     
-    def _make_api_request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
+    def _make_api_request(self, method: str, url: str, **kwargs) -> Optional[Dict]:
         """Make authenticated API request with rate limiting"""
-        if not self.access_token:
-            logger.error("No access token available. Please authenticate first.")
+        if not self.is_authenticated():
+            logger.error("No valid access token available (missing or expired). Please authenticate first.")
             return None
         
-        self._wait_for_rate_limit()
-        
-        headers = DEFAULT_HEADERS.copy()
-        headers['Authorization'] = f'Bearer {self.access_token}'
-        
-        url = f"{self.base_url}/{endpoint}"
-        
-        try:
-            response = self.session.request(method, url, headers=headers, **kwargs)
-            self.rate_limiter.record_request()
-            
-            if response.status_code == 429:
-                logger.warning("Rate limit exceeded, will retry...")
-                retry_after = int(response.headers.get('Retry-After', 60))
-                time.sleep(retry_after)
-                return self._make_api_request(method, endpoint, **kwargs)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES):
+            if not self.rate_limiter.acquire():
+                logger.error("DigiKey daily request limit reached")
+                return None
             
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            return None
+            try:
+                response = self.session.request(method, url, **kwargs)
+                self.rate_limiter.update_from_headers(response.headers)
+                
+                if response.status_code == 429:
+                    delay = self._backoff_delay(attempt, response.headers.get('Retry-After'))
+                    logger.warning("Rate limit exceeded, retrying in %.1f seconds...", delay)
+                    self.rate_limiter.pause(delay)
+                    continue
+                
+                response.raise_for_status()
+                return json_loads(response.content)
+                
+            except (requests.RequestException, ValueError) as e:
+                # ValueError covers a body that is not valid JSON
+                logger.error(f"API request failed: {e}")
+                return None
+        
+        logger.error(f"API request to {url} still rate limited after {MAX_RATE_LIMIT_RETRIES} attempts")
+        return None
     
     def search_products(self, keyword: str, manufacturer: Optional[str] = None, category: Optional[str] = None, limit: int = 50) -> Optional[List[Dict]]:
         """Search for products using DigiKey Product Information API v4"""
@@ -224,19 +310,17 @@ class DigiKeyAPIClient:
         if category:
             search_data["Filters"]["CategoryName"] = [category]
         
-        endpoint = f"Search/{PRODUCT_INFO_VERSION}/Products/Keyword"
-        response = self._make_api_request("POST", endpoint, json=search_data)
+        response = self._make_api_request("POST", self._search_url, json=search_data)
         
         if response and "Products" in response:
-            logger.info(f"Found {len(response['Products'])} products for '{keyword}'")
+            logger.info("Found %d products for '%s'", len(response['Products']), keyword)
             return response["Products"]
         
         return []
     
     def get_product_details(self, part_number: str) -> Optional[Dict]:
         """Get detailed information for a specific part number"""
-        endpoint = f"Search/{PRODUCT_INFO_VERSION}/Products/{part_number}"
-        response = self._make_api_request("GET", endpoint)
+        response = self._make_api_request("GET", self._product_detail_prefix + part_number)
         
         if response and "Product" in response:
             return response["Product"]
@@ -252,28 +336,27 @@ class DigiKeyAPIClient:
         category_config = ELECTRICAL_CATEGORIES[component_type]
         search_terms = category_config["search_terms"]
         
-        all_products = []
-        
+        # Deduplicate by part number while collecting, stopping once limit products are found
+        unique_products: Dict[str, Dict] = {}
+        search_products = self.search_products
         for search_term in search_terms:
-            products = self.search_products(
+            products = search_products(
                 keyword=f"{manufacturer} {search_term}",
                 manufacturer=manufacturer,
                 limit=limit
             )
             
             if products:
-                all_products.extend(products)
+                for product in products:
+                    part_number = product.get("DigiKeyPartNumber")
+                    if part_number and part_number not in unique_products:
+                        unique_products[part_number] = product
+                        if len(unique_products) >= limit:
+                            break
                 # Stop after finding products to avoid duplicate results
                 break
         
-        # Remove duplicates based on part number
-        unique_products = {}
-        for product in all_products:
-            part_number = product.get("DigiKeyPartNumber")
-            if part_number and part_number not in unique_products:
-                unique_products[part_number] = product
-        
-        return list(unique_products.values())[:limit]
+        return list(unique_products.values())
     
     def extract_specifications(self, product: Dict) -> Dict[str, Any]:
         """Extract electrical specifications from DigiKey product data"""
@@ -286,50 +369,22 @@ class DigiKeyAPIClient:
         specs["category"] = product.get("Category", {}).get("Name", "")
         
         # Extract technical parameters from product description and parameters
-        description = specs["description"].upper()
-        
-        # Extract current rating
-        for pattern in CURRENT_RATING_PATTERNS:
-            match = re.search(pattern, description)
-            if match:
-                specs["current_rating"] = int(match.group(1))
-                break
-        
-        # Extract voltage rating  
-        for pattern in VOLTAGE_RATING_PATTERNS:
-            match = re.search(pattern, description)
-            if match:
-                specs["voltage_rating"] = int(match.group(1))
-                break
+        # Extract current, voltage and pole ratings in one case-insensitive scan of the description
+        for match in SPECIFICATION_PATTERN.finditer(specs["description"]):
+            if match.lastgroup not in specs:
+                specs[match.lastgroup] = int(match.group(match.lastgroup))
         
-        # Extract pole count
-        for pattern in POLE_COUNT_PATTERNS:
-            match = re.search(pattern, description)
-            if match:
-                specs["pole_count"] = int(match.group(1))
-                break
-        
-        # Extract from Parameters array if available
+        # Extract from Parameters array if available; these override the description
         parameters = product.get("Parameters", [])
         for param in parameters:
-            param_name = param.get("Parameter", "").lower()
-            param_value = param.get("Value", "")
-            
-            if "current" in param_name and "rating" in param_name:
-                # Extract numeric value from parameter
-                current_match = re.search(r"(\d+)", param_value)
-                if current_match:
-                    specs["current_rating"] = int(current_match.group(1))
-            
-            elif "voltage" in param_name:
-                voltage_match = re.search(r"(\d+)", param_value)
-                if voltage_match:
-                    specs["voltage_rating"] = int(voltage_match.group(1))
+            spec_key = parameter_spec_key(param.get("Parameter", ""))
+            if spec_key is None:
+                continue
             
-            elif "pole" in param_name or "way" in param_name:
-                pole_match = re.search(r"(\d+)", param_value)
-                if pole_match:
-                    specs["pole_count"] = int(pole_match.group(1))
+            # Numeric value of the parameter
+            number_match = PARAMETER_NUMBER_PATTERN.search(param.get("Value", ""))
+            if number_match:
+                specs[spec_key] = int(number_match.group(1))
         
         # Add pricing info if available
         pricing = product.get("StandardPricing", [])
@@ -3,6 +3,8 @@ DigiKey API Configuration
 Configuration settings for DigiKey API integration
 """
 
+import re
+
 # DigiKey API Endpoints
 DIGIKEY_BASE_URL = "https://api.digikey.com"
 DIGIKEY_SANDBOX_URL = "https://sandbox-api.digikey.com"  # Free sandbox for development
@@ -21,6 +23,13 @@ REDIRECT_URI = "https://localhost:3000/callback"  # Your app's callback URL
 # Rate Limiting (Free Sandbox Limits)
 RATE_LIMIT_PER_MINUTE = 120
 RATE_LIMIT_PER_DAY = 10000  # Typical free tier daily limit
+MAX_RATE_LIMIT_RETRIES = 5  # Attempts per call while DigiKey keeps answering 429
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Connection pooling (one keep-alive pool per host, shared by concurrent syncs)
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16  # Most DigiKey requests in flight at once; further requests wait for a connection
 
 # Request Headers
 DEFAULT_HEADERS = {
@@ -32,24 +41,24 @@ DEFAULT_HEADERS = {
 # Electrical Component Categories
 ELECTRICAL_CATEGORIES = {
     "circuit_breakers": {
-        "search_terms": ["circuit breaker", "MCB", "miniature circuit breaker"],
-        "manufacturers": ["Hager", "Schneider Electric", "ABB", "Eaton", "Siemens"]
+        "search_terms": ("circuit breaker", "MCB", "miniature circuit breaker"),
+        "manufacturers": ("Hager", "Schneider Electric", "ABB", "Eaton", "Siemens")
     },
     "rcd_devices": {
-        "search_terms": ["RCD", "residual current device", "earth leakage"],
-        "manufacturers": ["Hager", "Schneider Electric", "ABB", "Eaton"]
+        "search_terms": ("RCD", "residual current device", "earth leakage"),
+        "manufacturers": ("Hager", "Schneider Electric", "ABB", "Eaton")
     },
     "rcbo_devices": {
-        "search_terms": ["RCBO", "residual current circuit breaker"],
-        "manufacturers": ["Hager", "Schneider Electric", "ABB", "Eaton"]
+        "search_terms": ("RCBO", "residual current circuit breaker"),
+        "manufacturers": ("Hager", "Schneider Electric", "ABB", "Eaton")
     },
     "smart_meters": {
-        "search_terms": ["smart meter", "digital meter", "energy meter"],
-        "manufacturers": ["Hager", "Schneider Electric", "ABB", "Siemens"]
+        "search_terms": ("smart meter", "digital meter", "energy meter"),
+        "manufacturers": ("Hager", "Schneider Electric", "ABB", "Siemens")
     },
     "contactors": {
-        "search_terms": ["contactor", "motor starter"],
-        "manufacturers": ["Schneider Electric", "ABB", "Siemens", "Eaton"]
+        "search_terms": ("contactor", "motor starter"),
+        "manufacturers": ("Schneider Electric", "ABB", "Siemens", "Eaton")
     }
 }
 
@@ -66,21 +75,36 @@ DEVICE_TYPE_MAPPING = {
     "Contactor": "CONTACTOR"
 }
 
+# Every DEVICE_TYPE_MAPPING key found in a category, overlapping matches included,
+# so the caller can pick the earliest key in mapping order
+DEVICE_CATEGORY_PATTERN = re.compile(
+    "(?=(" + "|".join(map(re.escape, DEVICE_TYPE_MAPPING)) + "))",
+    re.IGNORECASE
+)
+
+# Device type keywords in a product description, one named group per kind
+DEVICE_KEYWORD_PATTERN = re.compile(
+    r"(?P<rcd>RCD|RESIDUAL CURRENT)"
+    r"|(?P<circuit_breaker>CIRCUIT BREAKER)"
+    r"|(?P<rcbo>RCBO)"
+    r"|(?P<mcb>MCB|MINIATURE)"
+    r"|(?P<meter>SMART METER|ENERGY METER)"
+    r"|(?P<contactor>CONTACTOR)",
+    re.IGNORECASE
+)
+
 # Specification Extraction Patterns
-CURRENT_RATING_PATTERNS = [
-    r"(\d+)A",  # "16A", "32A"
-    r"(\d+)\s*Amp",  # "16 Amp"
-    r"Current.*?(\d+)A",  # "Current Rating: 16A"
-]
+# One case-insensitive pass over a product description finds every rating; the
+# leftmost match of each kind wins
+SPECIFICATION_PATTERN = re.compile(
+    r"(?P<current_rating>\d+)(?:A|\s*Amp)"  # "16A", "16 Amp"
+    r"|(?P<voltage_rating>\d+)(?:V|\s*Volt)"  # "230V", "230 Volt"
+    r"|(?P<pole_count>\d+)(?:\s*Pole|P|\s*Way)",  # "2 Pole", "2P", "2 Way"
+    re.IGNORECASE
+)
 
-VOLTAGE_RATING_PATTERNS = [
-    r"(\d+)V",  # "230V", "400V"
-    r"(\d+)\s*Volt",  # "230 Volt"
-    r"Voltage.*?(\d+)V",  # "Voltage: 230V"
-]
+# Pole count alone, for descriptions where a rating may come first ("16A 2P")
+POLE_COUNT_PATTERN = re.compile(r"(\d+)(?:\s*Pole|P|\s*Way)", re.IGNORECASE)
 
-POLE_COUNT_PATTERNS = [
-    r"(\d+)\s*Pole",  # "2 Pole", "4 Pole"
-    r"(\d+)P",  # "2P", "4P"
-    r"(\d+)\s*Way",  # "2 Way"
-]
\ No newline at end of file
+# First number in a DigiKey parameter value, e.g. "16 A" -> 16
+PARAMETER_NUMBER_PATTERN = re.compile(r"(\d+)")
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Device Template Cache
+In-process LRU of the template fields the slot placement checks need
+"""
+
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import DeviceTemplate
+
+MAX_CACHED_TEMPLATES = 1024
+# Invalidation only reaches the worker process that handled the update, so entries
+# also expire: other workers see an edited template within this many seconds
+TEMPLATE_CACHE_TTL = 30
+
+
+class TemplateInfo(NamedTuple):
+    """Placement-relevant fields of a device template (plain values, no ORM instance is pinned)"""
+    id: int
+    name: str
+    slots_required: Optional[int]
+
+
+# template id -> (fields, time.monotonic() deadline)
+_template_cache: "OrderedDict[int, Tuple[TemplateInfo, float]]" = OrderedDict()
+
+
+async def get_template_info(db: AsyncSession, template_id: int) -> Optional[TemplateInfo]:
+    """Return the cached template fields, loading them on a miss or expiry. Missing templates are not cached."""
+    entry = _template_cache.get(template_id)
+    if entry is not None and entry[1] > time.monotonic():
+        _template_cache.move_to_end(template_id)
+        return entry[0]
+
+    row = (await db.execute(
+        select(DeviceTemplate.id, DeviceTemplate.name, DeviceTemplate.slots_required)
+        .where(DeviceTemplate.id == template_id)
+    )).first()
+    if row is None:
+        _template_cache.pop(template_id, None)
+        return None
+
+    info = TemplateInfo(*row)
+    _template_cache[template_id] = (info, time.monotonic() + TEMPLATE_CACHE_TTL)
+    _template_cache.move_to_end(template_id)
+    if len(_template_cache) > MAX_CACHED_TEMPLATES:
+        _template_cache.popitem(last=False)
+    return info
+
+
+def invalidate_template_info(template_id: Optional[int] = None):
+    """Drop one template from the cache, or all of them when no id is given"""
+    if template_id is None:
+        _template_cache.clear()
+    else:
+        _template_cache.pop(template_id, None)
@@ -3,42 +3,73 @@ Device Template Mapper
 Converts DigiKey API responses to DeviceTemplate database models
 """
 
-import re
 import logging
-from typing import Dict, List, Optional, Any
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
 from decimal import Decimal
 
 from models import DeviceTemplate, PanelTemplate
-from services.digikey_config import DEVICE_TYPE_MAPPING
+from services.digikey_config import (
+    DEVICE_TYPE_MAPPING, DEVICE_CATEGORY_PATTERN, DEVICE_KEYWORD_PATTERN, POLE_COUNT_PATTERN
+)
 
 logger = logging.getLogger(__name__)
 
+# Lowercased DigiKey category keyword -> (mapping order, device type)
+CATEGORY_PRIORITY = {
+    digikey_type.lower(): (order, device_type)
+    for order, (digikey_type, device_type) in enumerate(DEVICE_TYPE_MAPPING.items())
+}
+
+# Single phase: Live, Neutral, Earth
+SINGLE_PHASE_WIRE_COLORS = ("Brown", "Blue", "Green/Yellow")
+# Three phase: L1, L2, L3, Neutral, Earth
+THREE_PHASE_WIRE_COLORS = ("Brown", "Black", "Grey", "Blue", "Green/Yellow")
+
+# (device type, rated above 230V) -> wire colors; unlisted combinations are single phase.
+# Contactors and smart meters are wired three phase whatever their rating.
+WIRE_COLORS = {
+    ("MCB", True): THREE_PHASE_WIRE_COLORS,
+    ("RCBO", True): THREE_PHASE_WIRE_COLORS,
+    ("CONTACTOR", False): THREE_PHASE_WIRE_COLORS,
+    ("CONTACTOR", True): THREE_PHASE_WIRE_COLORS,
+    ("SMART_METER", False): THREE_PHASE_WIRE_COLORS,
+    ("SMART_METER", True): THREE_PHASE_WIRE_COLORS,
+}
+
+# UK/EU standard wire cross-sections: ratings up to CURRENT_BREAKPOINTS[i] amps take
+# WIRE_CROSS_SECTIONS[i]; anything above the last breakpoint takes the final entry
+CURRENT_BREAKPOINTS = (6, 16, 20, 32, 40, 50)
+WIRE_CROSS_SECTIONS = (("1.5mm²",), ("2.5mm²",), ("4.0mm²",), ("6.0mm²",), ("10.0mm²",), ("16.0mm²",), ("25.0mm²",))
+DEFAULT_WIRE_CROSS_SECTIONS = ("2.5mm²",)
+
 
 class DeviceTemplateMapper:
     """Maps DigiKey product data to DeviceTemplate models"""
     
     @staticmethod
+    @lru_cache(maxsize=8192)
     def determine_device_type(category: str, description: str) -> str:
-        """Determine device type from DigiKey category and description"""
-        category_upper = category.upper()
-        description_upper = description.upper()
-        
-        # Check category first
-        for digikey_type, device_type in DEVICE_TYPE_MAPPING.items():
-            if digikey_type.upper() in category_upper:
-                return device_type
+        """Determine device type from DigiKey category and description. Search results repeat
+        the same few categories and many descriptions, so results are cached (bounded)."""
+        # Check category first; the earliest mapping entry found wins
+        matches = [CATEGORY_PRIORITY[match.group(1).lower()] for match in DEVICE_CATEGORY_PATTERN.finditer(category)]
+        if matches:
+            return min(matches)[1]
         
         # Check description for device type keywords
-        if any(keyword in description_upper for keyword in ["RCD", "RESIDUAL CURRENT"]):
-            if any(keyword in description_upper for keyword in ["CIRCUIT BREAKER", "RCBO"]):
+        kinds = {match.lastgroup for match in DEVICE_KEYWORD_PATTERN.finditer(description)}
+        if "rcd" in kinds:
+            if "circuit_breaker" in kinds or "rcbo" in kinds:
                 return "RCBO"
             else:
                 return "RCD"
-        elif any(keyword in description_upper for keyword in ["CIRCUIT BREAKER", "MCB", "MINIATURE"]):
+        elif "circuit_breaker" in kinds or "mcb" in kinds:
             return "MCB"
-        elif any(keyword in description_upper for keyword in ["SMART METER", "ENERGY METER"]):
+        elif "meter" in kinds:
             return "SMART_METER"
-        elif any(keyword in description_upper for keyword in ["CONTACTOR"]):
+        elif "contactor" in kinds:
             return "CONTACTOR"
         
         # Default fallback
@@ -47,8 +78,6 @@ class DeviceTemplateMapper:
     @staticmethod
     def determine_slots_required(device_type: str, pole_count: Optional[int] = None, description: str = "") -> int:
         """Determine number of DIN rail slots required"""
-        description_upper = description.upper()
-        
         if device_type == "SMART_METER":
             # Smart meters typically require 4 slots
             return 4
@@ -61,10 +90,9 @@ class DeviceTemplateMapper:
                 return pole_count
             
             # Try to extract pole count from description
-            for pattern in [r"(\d+)\s*POLE", r"(\d+)P", r"(\d+)\s*WAY"]:
-                match = re.search(pattern, description_upper)
-                if match:
-                    return int(match.group(1))
+            match = POLE_COUNT_PATTERN.search(description)
+            if match:
+                return int(match.group(1))
             
             # Default for single pole MCB/RCD
             return 1
@@ -76,67 +104,38 @@ class DeviceTemplateMapper:
         return 1
     
     @staticmethod
-    def extract_wire_colors(device_type: str, voltage_rating: Optional[int] = None) -> List[str]:
-        """Get appropriate wire colors for device type and voltage"""
-        if device_type in ["MCB", "RCBO"] and voltage_rating:
-            if voltage_rating <= 230:
-                # Single phase: Live, Neutral, Earth
-                return ["Brown", "Blue", "Green/Yellow"]
-            else:
-                # Three phase: L1, L2, L3, Neutral, Earth  
-                return ["Brown", "Black", "Grey", "Blue", "Green/Yellow"]
-        elif device_type == "RCD":
-            # RCD typically has Live, Neutral, Earth
-            return ["Brown", "Blue", "Green/Yellow"]
-        elif device_type == "CONTACTOR":
-            # Three phase contactor
-            return ["Brown", "Black", "Grey", "Blue", "Green/Yellow"]
-        elif device_type == "SMART_METER":
-            # Smart meter connections
-            return ["Brown", "Black", "Grey", "Blue", "Green/Yellow"]
-        
-        # Default single phase colors
-        return ["Brown", "Blue", "Green/Yellow"]
+    def extract_wire_colors(device_type: str, voltage_rating: Optional[int] = None) -> Tuple[str, ...]:
+        """Get appropriate wire colors for device type and voltage (a shared tuple, not to be mutated)"""
+        three_phase = bool(voltage_rating and voltage_rating > 230)
+        return WIRE_COLORS.get((device_type, three_phase), SINGLE_PHASE_WIRE_COLORS)
     
     @staticmethod
-    def extract_wire_cross_sections(current_rating: Optional[int] = None) -> List[str]:
-        """Get appropriate wire cross-sections based on current rating"""
+    def extract_wire_cross_sections(current_rating: Optional[int] = None) -> Tuple[str, ...]:
+        """Get appropriate wire cross-sections based on current rating (a shared tuple, not to be mutated)"""
         if not current_rating:
-            return ["2.5mm²"]
+            return DEFAULT_WIRE_CROSS_SECTIONS
         
-        # UK/EU standard wire cross-sections for different current ratings
-        if current_rating <= 6:
-            return ["1.5mm²"]
-        elif current_rating <= 16:
-            return ["2.5mm²"]
-        elif current_rating <= 20:
-            return ["4.0mm²"]
-        elif current_rating <= 32:
-            return ["6.0mm²"]
-        elif current_rating <= 40:
-            return ["10.0mm²"]
-        elif current_rating <= 50:
-            return ["16.0mm²"]
-        else:
-            return ["25.0mm²"]
+        return WIRE_CROSS_SECTIONS[bisect_left(CURRENT_BREAKPOINTS, current_rating)]
     
     @classmethod
     def create_device_template_from_digikey(cls, digikey_specs: Dict[str, Any]) -> DeviceTemplate:
         """Create DeviceTemplate from DigiKey product specifications"""
         
+        get = digikey_specs.get
+        
         # Extract basic information
-        part_number = digikey_specs.get("part_number", "")
-        manufacturer = digikey_specs.get("manufacturer", "")
-        description = digikey_specs.get("description", "")
-        category = digikey_specs.get("category", "")
+        part_number = get("part_number", "")
+        manufacturer = get("manufacturer", "")
+        description = get("description", "")
+        category = get("category", "")
         
         # Determine device type
         device_type = cls.determine_device_type(category, description)
         
         # Extract electrical specifications
-        current_rating = digikey_specs.get("current_rating")
-        voltage_rating = digikey_specs.get("voltage_rating", 230)  # Default to 230V
-        pole_count = digikey_specs.get("pole_count")
+        current_rating = get("current_rating")
+        voltage_rating = get("voltage_rating", 230)  # Default to 230V
+        pole_count = get("pole_count")
         
         # Determine physical properties
         slots_required = cls.determine_slots_required(device_type, pole_count, description)
@@ -145,110 +144,115 @@ class DeviceTemplateMapper:
         wire_colors = cls.extract_wire_colors(device_type, voltage_rating)
         wire_cross_sections = cls.extract_wire_cross_sections(current_rating)
         
-        # Create template name
-        template_name = f"{manufacturer} {device_type}"
+        # Create template name, e.g. "Hager MCB 16A" (voltage only when not 230V)
+        name_parts = [manufacturer, device_type]
         if current_rating:
-            template_name += f" {current_rating}A"
+            name_parts.append(f"{current_rating}A")
         if voltage_rating != 230:
-            template_name += f" {voltage_rating}V"
+            name_parts.append(f"{voltage_rating}V")
+        template_name = " ".join(name_parts)
         
-        # Create DeviceTemplate
+        # Create DeviceTemplate; the DigiKey part number is the model, unique per manufacturer
         device_template = DeviceTemplate(
             name=template_name,
+            model=part_number,
             manufacturer=manufacturer,
-            part_number=part_number,
             device_type=device_type,
-            current_rating=current_rating,
-            voltage_rating=voltage_rating,
+            category=category,
+            rated_current=current_rating,
+            voltage_range=f"{voltage_rating}V",
             pole_count=pole_count or 1,
             slots_required=slots_required,
-            wire_colors=wire_colors,
-            wire_cross_sections=wire_cross_sections,
             description=description,
-            # Additional fields for tracking
-            digikey_part_number=part_number,
-            unit_price=digikey_specs.get("unit_price", 0.0),
-            currency=digikey_specs.get("currency", "USD"),
-            quantity_available=digikey_specs.get("quantity_available", 0)
+            # DigiKey data without a dedicated column
+            features={
+                "wire_colors": wire_colors,
+                "wire_cross_sections": wire_cross_sections,
+                "digikey_part_number": part_number,
+                "unit_price": get("unit_price", 0.0),
+                "currency": get("currency", "USD"),
+                "quantity_available": get("quantity_available", 0)
+            }
         )
         
-        logger.info(f"Created DeviceTemplate: {template_name}")
+        logger.debug("Created DeviceTemplate: %s", template_name)
         return device_template
     
     @classmethod
     def create_device_templates_from_search(cls, search_results: List[Dict[str, Any]]) -> List[DeviceTemplate]:
         """Create multiple DeviceTemplates from DigiKey search results"""
         templates = []
+        add_template = templates.append
+        create_template = cls.create_device_template_from_digikey
         
         for product_specs in search_results:
             try:
-                template = cls.create_device_template_from_digikey(product_specs)
-                templates.append(template)
+                add_template(create_template(product_specs))
             except Exception as e:
                 logger.error(f"Failed to create template for {product_specs.get('part_number', 'unknown')}: {e}")
                 continue
         
-        logger.info(f"Created {len(templates)} device templates from {len(search_results)} search results")
+        logger.info("Created %d device templates from %d search results", len(templates), len(search_results))
         return templates
 
 
+# Standard Hager Volta consumer units seeded as panel templates
+HAGER_PANELS = (
+    {
+        "name": "Hager Volta VML306 6-Way",
+        "manufacturer": "Hager",
+        "series": "Volta",
+        "model_number": "VML306",
+        "slot_count": 6,
+        "mounting_type": "Surface Mount",
+        "ip_rating": "IP30",
+        "dimensions": "192mm x 144mm x 85mm",
+        "description": "6-way consumer unit with 100A main switch"
+    },
+    {
+        "name": "Hager Volta VML912 12-Way",
+        "manufacturer": "Hager",
+        "series": "Volta",
+        "model_number": "VML912", 
+        "slot_count": 12,
+        "mounting_type": "Surface Mount",
+        "ip_rating": "IP30",
+        "dimensions": "264mm x 144mm x 85mm",
+        "description": "12-way consumer unit with 100A main switch"
+    },
+    {
+        "name": "Hager Volta VML918 18-Way",
+        "manufacturer": "Hager",
+        "series": "Volta",
+        "model_number": "VML918",
+        "slot_count": 18,
+        "mounting_type": "Surface Mount", 
+        "ip_rating": "IP30",
+        "dimensions": "336mm x 144mm x 85mm",
+        "description": "18-way consumer unit with 100A main switch"
+    },
+    {
+        "name": "Hager Volta VML924 24-Way",
+        "manufacturer": "Hager",
+        "series": "Volta",
+        "model_number": "VML924",
+        "slot_count": 24,
+        "mounting_type": "Surface Mount",
+        "ip_rating": "IP30", 
+        "dimensions": "408mm x 144mm x 85mm",
+        "description": "24-way consumer unit with 100A main switch"
+    },
+)
+
+
 class PanelTemplateMapper:
     """Maps panel specifications to PanelTemplate models"""
     
     @classmethod
     def create_hager_panel_templates(cls) -> List[PanelTemplate]:
         """Create standard Hager Volta panel templates"""
-        
-        hager_panels = [
-            {
-                "name": "Hager Volta VML306 6-Way",
-                "manufacturer": "Hager",
-                "series": "Volta",
-                "model_number": "VML306",
-                "slot_count": 6,
-                "mounting_type": "Surface Mount",
-                "ip_rating": "IP30",
-                "dimensions": "192mm x 144mm x 85mm",
-                "description": "6-way consumer unit with 100A main switch"
-            },
-            {
-                "name": "Hager Volta VML912 12-Way",
-                "manufacturer": "Hager",
-                "series": "Volta",
-                "model_number": "VML912", 
-                "slot_count": 12,
-                "mounting_type": "Surface Mount",
-                "ip_rating": "IP30",
-                "dimensions": "264mm x 144mm x 85mm",
-                "description": "12-way consumer unit with 100A main switch"
-            },
-            {
-                "name": "Hager Volta VML918 18-Way",
-                "manufacturer": "Hager",
-                "series": "Volta",
-                "model_number": "VML918",
-                "slot_count": 18,
-                "mounting_type": "Surface Mount", 
-                "ip_rating": "IP30",
-                "dimensions": "336mm x 144mm x 85mm",
-                "description": "18-way consumer unit with 100A main switch"
-            },
-            {
-                "name": "Hager Volta VML924 24-Way",
-                "manufacturer": "Hager",
-                "series": "Volta",
-                "model_number": "VML924",
-                "slot_count": 24,
-                "mounting_type": "Surface Mount",
-                "ip_rating": "IP30", 
-                "dimensions": "408mm x 144mm x 85mm",
-                "description": "24-way consumer unit with 100A main switch"
-            }
-        ]
-        
-        templates = []
-        for panel_data in hager_panels:
-            template = PanelTemplate(
+        templates = [
+            PanelTemplate(
                 name=panel_data["name"],
                 manufacturer=panel_data["manufacturer"],
                 series=panel_data["series"],
@@ -261,7 +265,8 @@ class PanelTemplateMapper:
                 protection_rating=panel_data["ip_rating"],
                 description=panel_data["description"]
             )
-            templates.append(template)
+            for panel_data in HAGER_PANELS
+        ]
         
-        logger.info(f"Created {len(templates)} Hager panel templates")
+        logger.info("Created %d Hager panel templates", len(templates))
         return templates
\ No newline at end of file
@@ -4,30 +4,69 @@ Orchestrates fetching components from DigiKey API and updating database template
 """
 
 import logging
-from typing import Dict, List, Optional, Set, Any, Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Any, Union
 from datetime import datetime
+from sqlalchemy import inspect, insert, select, tuple_
 from sqlalchemy.orm import Session
 
 from services.digikey_client import DigiKeyAPIClient
 from services.template_mapper import DeviceTemplateMapper, PanelTemplateMapper
-from database import get_db
+from database import SessionLocal, get_db
 from models import DeviceTemplate, PanelTemplate
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT chunk, kept under PostgreSQL's 65535 bind parameters per statement
+# with headroom for a wider table
+DEVICE_TEMPLATE_BATCH_SIZE = 65535 // int(len(DeviceTemplate.__table__.columns) * 1.2)
+
+# Manufacturers synced at once; each sync mostly waits on DigiKey
+MAX_CONCURRENT_SYNCS = 4
+# Component type searches run at once within one manufacturer's sync. With MAX_CONCURRENT_SYNCS
+# this bounds the DigiKey requests in flight to HTTP_POOL_MAXSIZE (4 x 4 = 16)
+MAX_CONCURRENT_COMPONENT_SEARCHES = 4
+
+# How long a successful DigiKey connection check is trusted; each check spends a rate limit slot
+API_VALIDATION_TTL_SECONDS = 60
+
+# Specification columns a sync fills in on an existing template only when it has none
+FILLABLE_SPEC_FIELDS = ("rated_current", "voltage_range", "pole_count")
+
+
+def batch_iterable(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Yield successive lists of at most batch_size items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def template_row(template: Union[DeviceTemplate, PanelTemplate]) -> Dict[str, Any]:
+    """Column values set on a transient template, as an INSERT parameter set"""
+    state = inspect(template).dict
+    return {column.key: state[column.key] for column in type(template).__table__.columns if column.key in state}
+
 
 class TemplateSyncService:
     """Service for synchronizing device templates with DigiKey API"""
     
-    def __init__(self, digikey_client: DigiKeyAPIClient):
+    def __init__(self, digikey_client: DigiKeyAPIClient, create_batch_size: int = DEVICE_TEMPLATE_BATCH_SIZE):
         self.digikey_client = digikey_client
         self.mapper = DeviceTemplateMapper()
+        self.create_batch_size = create_batch_size
         self.sync_stats = {
             "new_templates": 0,
             "updated_templates": 0,
             "errors": 0,
             "last_sync": None
         }
+        # Manufacturer syncs may run on several threads at once
+        self._stats_lock = threading.Lock()
+        # Monotonic time until which the last successful connection check still holds
+        self._api_validated_until = 0.0
     
     def sync_manufacturer_components(self, manufacturer: str, component_types: Optional[List[str]] = None, db: Optional[Session] = None) -> Dict[str, Union[int, str, List[str]]]:
         """Sync components for a specific manufacturer"""
@@ -35,7 +74,7 @@ class TemplateSyncService:
             logger.error("DigiKey API not configured. Please set DIGIKEY_CLIENT_ID and DIGIKEY_CLIENT_SECRET")
             return {"error": "API not configured"}
         
-        if not self.digikey_client.access_token:
+        if not self.digikey_client.is_authenticated():
             logger.error("DigiKey API not authenticated. Please authenticate first.")
             return {"error": "Not authenticated"}
         
@@ -53,94 +92,122 @@ class TemplateSyncService:
             "component_types": component_types
         }
         
-        logger.info(f"Starting sync for {manufacturer} components: {component_types}")
+        logger.info("Starting sync for %s components: %s", manufacturer, component_types)
+        
+        def search_component_type(component_type: str) -> List[Dict[str, Any]]:
+            return self.digikey_client.search_electrical_components(
+                component_type=component_type,
+                manufacturer=manufacturer,
+                limit=20  # Limit per component type to stay within rate limits
+            )
+        
+        # Search the component types concurrently; each search is a single request at a time
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_COMPONENT_SEARCHES, len(component_types)))) as executor:
+            searches = {component_type: executor.submit(search_component_type, component_type) for component_type in component_types}
         
-        for component_type in component_types:
+        # Templates keyed by (manufacturer, model), the unique natural key; the first find wins
+        found_templates: Dict[tuple, DeviceTemplate] = {}
+        for component_type, search in searches.items():
             try:
-                # Search for components of this type
-                products = self.digikey_client.search_electrical_components(
-                    component_type=component_type,
-                    manufacturer=manufacturer,
-                    limit=20  # Limit per component type to stay within rate limits
-                )
+                products = search.result()
                 
                 if not products:
-                    logger.info(f"No {component_type} products found for {manufacturer}")
+                    logger.info("No %s products found for %s", component_type, manufacturer)
                     continue
                 
-                # Extract specifications from each product
-                component_specs = []
-                for product in products:
-                    specs = self.digikey_client.extract_specifications(product)
-                    component_specs.append(specs)
+                # Extract specifications from each product (local parsing, no further requests)
+                extract_specifications = self.digikey_client.extract_specifications
+                component_specs = [extract_specifications(product) for product in products]
                 
                 # Create device templates
                 new_templates = self.mapper.create_device_templates_from_search(component_specs)
-                
-                # Save to database
                 for template in new_templates:
-                    existing_template = db.query(DeviceTemplate).filter(
-                        DeviceTemplate.part_number == template.part_number
-                    ).first()
-                    
-                    if existing_template:
-                        # Update existing template
-                        self._update_existing_template(existing_template, template, db)
-                        results["updated_templates"] += 1
-                    else:
-                        # Add new template
-                        db.add(template)
-                        results["new_templates"] += 1
+                    found_templates.setdefault((template.manufacturer, template.model), template)
                 
-                logger.info(f"Processed {len(new_templates)} {component_type} templates for {manufacturer}")
+                logger.info("Processed %d %s templates for %s", len(new_templates), component_type, manufacturer)
                 
             except Exception as e:
                 logger.error(f"Error syncing {component_type} for {manufacturer}: {e}")
                 results["errors"] += 1
         
-        # Commit all changes
+        # Nothing to look up or insert: skip the database round trips entirely
+        if not found_templates:
+            logger.info("No templates found for %s", manufacturer)
+            self._record_sync(results)
+            return results
+        
+        # Save to database: look up existing templates and insert new ones a chunk at a time
         try:
+            # One IN query per manufacturer and chunk, served by the (manufacturer, model) unique index
+            models_by_manufacturer: Dict[str, List[str]] = {}
+            for template_manufacturer, model in found_templates:
+                models_by_manufacturer.setdefault(template_manufacturer, []).append(model)
+            
+            existing_templates = {}
+            for template_manufacturer, manufacturer_models in models_by_manufacturer.items():
+                for models in batch_iterable(manufacturer_models, self.create_batch_size):
+                    for existing in db.scalars(
+                        select(DeviceTemplate)
+                        .where(DeviceTemplate.manufacturer == template_manufacturer, DeviceTemplate.model.in_(models))
+                    ):
+                        existing_templates[(existing.manufacturer, existing.model)] = existing
+            
+            new_rows = []
+            for key, template in found_templates.items():
+                existing_template = existing_templates.get(key)
+                if existing_template:
+                    self._update_existing_template(existing_template, template, db)
+                    results["updated_templates"] += 1
+                else:
+                    new_rows.append(template_row(template))
+                    results["new_templates"] += 1
+            
+            for rows in batch_iterable(new_rows, self.create_batch_size):
+                db.execute(insert(DeviceTemplate), rows)
+            
             db.commit()
-            logger.info(f"Sync completed for {manufacturer}: {results['new_templates']} new, {results['updated_templates']} updated, {results['errors']} errors")
+            logger.info(
+                "Sync completed for %s: %d new, %d updated, %d errors",
+                manufacturer, results["new_templates"], results["updated_templates"], results["errors"]
+            )
         except Exception as e:
             logger.error(f"Failed to commit templates to database: {e}")
             db.rollback()
+            results["new_templates"] = results["updated_templates"] = 0
             results["errors"] += 1
         
-        # Update sync stats
-        self.sync_stats["new_templates"] += results["new_templates"]
-        self.sync_stats["updated_templates"] += results["updated_templates"]
-        self.sync_stats["errors"] += results["errors"]
-        self.sync_stats["last_sync"] = datetime.now()
-        
+        self._record_sync(results)
         return results
     
+    def _record_sync(self, results: Dict[str, Any]):
+        """Add one manufacturer sync's counts to the sync stats"""
+        with self._stats_lock:
+            self.sync_stats["new_templates"] += results["new_templates"]
+            self.sync_stats["updated_templates"] += results["updated_templates"]
+            self.sync_stats["errors"] += results["errors"]
+            self.sync_stats["last_sync"] = datetime.now()
+    
     def _update_existing_template(self, existing: DeviceTemplate, new: DeviceTemplate, db: Session):
         """Update an existing template with new data"""
-        # Update pricing and availability information
-        if hasattr(new, 'unit_price') and new.unit_price:
-            existing.unit_price = new.unit_price
-        if hasattr(new, 'currency') and new.currency:
-            existing.currency = new.currency
-        if hasattr(new, 'quantity_available') and new.quantity_available:
-            existing.quantity_available = new.quantity_available
+        # Refresh pricing and availability information
+        if new.features:
+            existing.features = {**(existing.features or {}), **new.features}
         
         # Update description if improved
-        if len(new.description) > len(existing.description):
-            existing.description = new.description
+        new_description = new.description
+        if new_description and len(new_description) > len(existing.description or ""):
+            existing.description = new_description
         
         # Update specifications if they were missing
-        if not existing.current_rating and new.current_rating:
-            existing.current_rating = new.current_rating
-        if not existing.voltage_rating and new.voltage_rating:
-            existing.voltage_rating = new.voltage_rating
-        if not existing.pole_count and new.pole_count:
-            existing.pole_count = new.pole_count
-        
-        logger.info(f"Updated existing template: {existing.name}")
+        for field in FILLABLE_SPEC_FIELDS:
+            value = getattr(new, field)
+            if value and not getattr(existing, field):
+                setattr(existing, field, value)
+        
+        logger.debug("Updated existing template: %s", existing.name)
     
-    def sync_all_supported_manufacturers(self, component_types: Optional[List[str]] = None, db: Optional[Session] = None) -> Dict[str, Any]:
-        """Sync components for all supported manufacturers"""
+    def sync_all_supported_manufacturers(self, component_types: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Sync components for all supported manufacturers concurrently, each on its own session"""
         manufacturers = ["Hager", "Schneider Electric", "ABB", "Eaton"]
         
         overall_results = {
@@ -150,9 +217,18 @@ class TemplateSyncService:
             "manufacturer_results": {}
         }
         
-        for manufacturer in manufacturers:
+        def sync_manufacturer(manufacturer: str) -> Dict[str, Any]:
+            # Sessions are not thread-safe, so every worker opens its own
+            with SessionLocal() as db:
+                return self.sync_manufacturer_components(manufacturer, component_types, db)
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_SYNCS, len(manufacturers))) as executor:
+            futures = {manufacturer: executor.submit(sync_manufacturer, manufacturer) for manufacturer in manufacturers}
+        
+        # Every sync has finished once the executor shuts down; aggregate in manufacturer order
+        for manufacturer, future in futures.items():
             try:
-                result = self.sync_manufacturer_components(manufacturer, component_types, db)
+                result = future.result()
                 overall_results["manufacturer_results"][manufacturer] = result
                 
                 if "error" not in result:
@@ -177,14 +253,21 @@ class TemplateSyncService:
             logger.error("DigiKey API credentials not configured")
             return False
         
-        if not self.digikey_client.access_token:
+        if not self.digikey_client.is_authenticated():
             logger.error("DigiKey API not authenticated")
             return False
         
+        if time.monotonic() < self._api_validated_until:
+            return True
+        
         try:
             # Try a simple search to validate connection
             results = self.digikey_client.search_products("Hager", limit=1)
-            return results is not None
+            if results is None:
+                return False
+            
+            self._api_validated_until = time.monotonic() + API_VALIDATION_TTL_SECONDS
+            return True
         except Exception as e:
             logger.error(f"API connection validation failed: {e}")
             return False
@@ -198,21 +281,28 @@ def create_initial_panel_templates(db: Optional[Session] = None) -> int:
     # Create Hager panel templates
     panel_templates = PanelTemplateMapper.create_hager_panel_templates()
     
-    templates_added = 0
+    # One lookup for every (manufacturer, model) already present, then one INSERT for all new rows
+    existing = set(db.execute(
+        select(PanelTemplate.manufacturer, PanelTemplate.model)
+        .where(tuple_(PanelTemplate.manufacturer, PanelTemplate.model).in_(
+            [(template.manufacturer, template.model) for template in panel_templates]
+        ))
+    ).tuples())
+    
+    new_rows = []
     for template in panel_templates:
-        existing = db.query(PanelTemplate).filter(
-            PanelTemplate.model == template.model,
-            PanelTemplate.manufacturer == template.manufacturer
-        ).first()
-        
-        if not existing:
-            db.add(template)
-            templates_added += 1
+        key = (template.manufacturer, template.model)
+        if key not in existing:
+            new_rows.append(template_row(template))
+            existing.add(key)
         else:
-            logger.info(f"Panel template {template.name} already exists")
+            logger.info("Panel template %s already exists", template.name)
     
+    templates_added = len(new_rows)
+    if new_rows:
+        db.execute(insert(PanelTemplate), new_rows)
     db.commit()
-    logger.info(f"Added {templates_added} new panel templates")
+    logger.info("Added %d new panel templates", templates_added)
     return templates_added
 
 
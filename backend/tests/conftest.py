@@ -0,0 +1,48 @@
+"""
+Test fixtures: the app against a fresh in-memory database per test
+(set TEST_DATABASE_URL to run against another database)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Settings are read at import, so the database is chosen before any backend module loads
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from database import Base, engine
+from main import app
+from services.template_cache import invalidate_template_info
+
+PANEL_TEMPLATE = {
+    "name": "Hager Volta VML712 12-Way",
+    "model": "VML712",
+    "slots_per_row": 6,
+    "voltage": 230,
+    "max_current": 100,
+}
+
+DEVICE_TEMPLATE = {
+    "name": "Hager MCB 16A",
+    "model": "MBN116",
+    "device_type": "MCB",
+    "category": "Protection",
+}
+
+
+@pytest.fixture
+def tables():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+    invalidate_template_info()
+
+
+@pytest.fixture
+def client(tables):
+    with TestClient(app) as client:
+        yield client
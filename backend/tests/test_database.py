@@ -0,0 +1,15 @@
+from tests.conftest import DEVICE_TEMPLATE, PANEL_TEMPLATE
+
+
+def test_devices_router_shares_the_sync_routers_database(client):
+    """Rows written through the sync Session are visible to the AsyncSession devices router"""
+    template_id = client.post("/api/templates/panel-templates", json=PANEL_TEMPLATE).json()["id"]
+    device_id = client.post("/api/templates/device-templates", json=DEVICE_TEMPLATE).json()["id"]
+    panel_id = client.post("/api/panels/", json={"name": "Kitchen", "template_id": template_id}).json()["id"]
+    slot_id = client.get(f"/api/panels/{panel_id}").json()["slots"][0]["id"]
+    
+    response = client.get(f"/api/devices/slots/{slot_id}/can-place/{device_id}")
+    
+    assert response.status_code == 200, response.text
+    assert response.json()["can_place"] is True
+    assert response.json()["device_info"]["id"] == device_id
@@ -0,0 +1,30 @@
+import csv
+import json
+
+from sqlalchemy import func, select
+
+from database import SessionLocal
+from db_migrations.init_sqlalchemy_db import COPY_NULL, TEMPLATES_DATA_PATH, copy_csv, seed_templates
+from models import DeviceTemplate
+
+
+def test_copy_csv_keeps_empty_strings_apart_from_nulls():
+    """None is written as the COPY NULL marker, so an empty string still loads as ''"""
+    columns = [DeviceTemplate.__table__.c[name] for name in ("model", "series", "description", "features")]
+    rows = [{"model": "MBN116", "series": "", "description": None, "features": {"din_rail": True}}]
+    
+    written = next(csv.reader(copy_csv(columns, rows)))
+    
+    assert written == ["MBN116", "", COPY_NULL, json.dumps({"din_rail": True})]
+
+
+def test_seed_templates_inserts_once(tables):
+    """Seeding again skips the templates that already exist"""
+    with open(TEMPLATES_DATA_PATH, encoding="utf-8") as f:
+        device_count = len(json.load(f)["device_templates"])
+    
+    seed_templates()
+    seed_templates()
+    
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(DeviceTemplate)) == device_count
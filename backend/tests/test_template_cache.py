@@ -0,0 +1,30 @@
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import update
+
+from database import SessionLocal
+from models import DeviceTemplate
+from services import template_cache
+from tests.conftest import DEVICE_TEMPLATE, PANEL_TEMPLATE
+
+
+def test_cached_template_expires_after_an_update_elsewhere(client, monkeypatch):
+    """An edit that skipped this process's invalidation is picked up once the entry expires"""
+    template_id = client.post("/api/templates/panel-templates", json=PANEL_TEMPLATE).json()["id"]
+    device_id = client.post("/api/templates/device-templates", json=DEVICE_TEMPLATE).json()["id"]
+    panel_id = client.post("/api/panels/", json={"name": "Kitchen", "template_id": template_id}).json()["id"]
+    slot_id = client.get(f"/api/panels/{panel_id}").json()["slots"][0]["id"]
+    can_place = f"/api/devices/slots/{slot_id}/can-place/{device_id}"
+    assert client.get(can_place).json()["device_info"]["slots_required"] == 1
+    
+    # As another worker would: straight to the database, bypassing invalidate_template_info
+    with SessionLocal() as db:
+        db.execute(update(DeviceTemplate).where(DeviceTemplate.id == device_id).values(slots_required=2))
+        db.commit()
+    assert client.get(can_place).json()["device_info"]["slots_required"] == 1
+    
+    later = time.monotonic() + template_cache.TEMPLATE_CACHE_TTL + 1
+    monkeypatch.setattr(template_cache, "time", SimpleNamespace(monotonic=lambda: later))
+    
+    assert client.get(can_place).json()["device_info"]["slots_required"] == 2
@@ -0,0 +1,49 @@
+from config import settings
+from database import SessionLocal
+from models import SyncJob
+from routers import template_sync
+from services.digikey_client import DigiKeyAPIClient
+
+
+def test_sync_job_is_marked_failed_when_the_run_itself_raises(tables, monkeypatch):
+    """An error outside any one manufacturer's sync still finishes the job instead of leaving it running"""
+    with SessionLocal() as db:
+        job = SyncJob(status="pending", manufacturers=["Hager"])
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    
+    def unavailable():
+        raise RuntimeError("DigiKey client unavailable")
+    monkeypatch.setattr(template_sync, "get_sync_service", unavailable)
+    
+    template_sync.run_sync_job(job_id, ["Hager"], None)
+    
+    with SessionLocal() as db:
+        job = db.get(SyncJob, job_id)
+        assert job.status == "failed"
+        assert job.error == "DigiKey client unavailable"
+        assert job.finished_at is not None
+
+
+def test_diagnose_revalidates_and_reports_failing_parts_as_details(client, monkeypatch):
+    """Unchanged answers come back as an empty 304; a part that would fail carries its error body"""
+    monkeypatch.setattr(settings, "digikey_client_id", None)
+    monkeypatch.setattr(template_sync, "_digikey_client", DigiKeyAPIClient())
+    
+    response = client.get("/api/template-sync/diagnose")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"]["api_configured"] is False
+    assert "not configured" in body["auth"]["detail"]
+    assert body["callback"] == {"detail": "No authorization code received from DigiKey"}
+    
+    etag = response.headers["ETag"]
+    revalidated = client.get("/api/template-sync/diagnose", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+    
+    answered = client.get("/api/template-sync/diagnose", params={"code": "abc"}, headers={"If-None-Match": etag})
+    assert answered.status_code == 200
+    assert answered.json()["callback"]["authorization_code"] == "abc"
@@ -0,0 +1,24 @@
+from tests.conftest import DEVICE_TEMPLATE, PANEL_TEMPLATE
+
+
+def test_duplicate_panel_template_is_a_conflict(client):
+    """A second panel template with the same manufacturer and model is rejected, not a 500"""
+    assert client.post("/api/templates/panel-templates", json=PANEL_TEMPLATE).status_code == 200
+    
+    response = client.post("/api/templates/panel-templates", json=PANEL_TEMPLATE)
+    
+    assert response.status_code == 409, response.text
+    # The rolled-back session still serves the original
+    assert len(client.get("/api/templates/panel-templates").json()) == 1
+
+
+def test_duplicate_device_template_is_a_conflict(client):
+    """Creating or renaming a device template onto an existing manufacturer and model is rejected"""
+    assert client.post("/api/templates/device-templates", json=DEVICE_TEMPLATE).status_code == 200
+    other_id = client.post("/api/templates/device-templates", json={**DEVICE_TEMPLATE, "model": "MBN120"}).json()["id"]
+    
+    assert client.post("/api/templates/device-templates", json=DEVICE_TEMPLATE).status_code == 409
+    
+    response = client.put(f"/api/templates/device-templates/{other_id}", json={"model": DEVICE_TEMPLATE["model"]})
+    
+    assert response.status_code == 409, response.text
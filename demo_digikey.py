@@ -7,16 +7,36 @@ Demonstrates how to use the DigiKey API integration for template synchronization
 import sys
 import os
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 from datetime import datetime
 
+# orjson is installed with the backend requirements; the stdlib serves otherwise
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as json_dumps, loads as json_loads
+
 # Add backend to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 # Configuration
 BASE_URL = "http://localhost:8000"
 API_BASE = f"{BASE_URL}/api/template-sync"
+REQUEST_TIMEOUT = (3, 30)  # (connect, read) seconds
+JSON_HEADERS = {"Content-Type": "application/json"}
+SYNC_POLL_INTERVAL = 2  # seconds between sync job status checks
+SYNC_POLL_TIMEOUT = 300  # seconds to wait for a sync job to finish
+SYNC_RUNNING_STATUSES = ("pending", "running")
+
+# One keep-alive connection pool for every demo step; idempotent requests retry on gateway errors
+SESSION = requests.Session()
+SESSION.mount(BASE_URL, HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
 
 def print_header(title):
     """Print a formatted header"""
@@ -35,24 +55,39 @@ def make_request(method, endpoint, data=None):
     
     try:
         if method.upper() == "GET":
-            response = requests.get(url)
+            response = SESSION.get(url, timeout=REQUEST_TIMEOUT)
         elif method.upper() == "POST":
-            headers = {"Content-Type": "application/json"}
-            response = requests.post(url, json=data, headers=headers)
+            body = json_dumps(data) if data is not None else None
+            response = SESSION.post(url, data=body, headers=JSON_HEADERS, timeout=REQUEST_TIMEOUT)
         
         response.raise_for_status()
-        return response.json()
+        return json_loads(response.content)
     
     except requests.exceptions.RequestException as e:
         print(f"❌ Request failed: {e}")
         if hasattr(e.response, 'text'):
             print(f"   Response: {e.response.text}")
         return None
+    except ValueError as e:
+        print(f"❌ Invalid JSON response: {e}")
+        return None
+
+def wait_for_sync_job(job_id):
+    """Poll a background sync job until it finishes; the last job state, or None on failure or timeout"""
+    deadline = time.monotonic() + SYNC_POLL_TIMEOUT
+    while True:
+        job = make_request("GET", f"/sync/jobs/{job_id}")
+        if job is None or job.get('status') not in SYNC_RUNNING_STATUSES:
+            return job
+        if time.monotonic() >= deadline:
+            print(f"❌ Sync job {job_id} still {job['status']} after {SYNC_POLL_TIMEOUT}s")
+            return None
+        time.sleep(SYNC_POLL_INTERVAL)
 
 def check_server_running():
     """Check if the backend server is running"""
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        response = SESSION.get(f"{BASE_URL}/health", timeout=5)
         return response.status_code == 200
     except:
         return False
@@ -154,17 +189,27 @@ def demo_integration():
         sync_result = make_request("POST", "/sync", sync_data)
         
         if sync_result:
-            print(f"✅ Sync Results:")
             print(f"   Status: {sync_result.get('status', 'unknown')}")
             print(f"   Message: {sync_result.get('message', 'No message')}")
+            print(f"   Waiting for sync job {sync_result['job_id']}...")
+            job = wait_for_sync_job(sync_result['job_id'])
+        else:
+            job = None
+        
+        if job:
+            print(f"✅ Sync Results:")
+            print(f"   Status: {job['status']}")
+            if job.get('error'):
+                print(f"   Error: {job['error']}")
             
-            if sync_result.get('results'):
-                for mfg, result in sync_result['results'].items():
-                    if isinstance(result, dict):
-                        new = result.get('new_templates', 0)
-                        updated = result.get('updated_templates', 0)
-                        errors = result.get('errors', 0)
-                        print(f"   {mfg}: {new} new, {updated} updated, {errors} errors")
+            for mfg, result in (job.get('results') or {}).items():
+                if 'error' in result:
+                    print(f"   {mfg}: failed - {result['error']}")
+                else:
+                    new = result.get('new_templates', 0)
+                    updated = result.get('updated_templates', 0)
+                    errors = result.get('errors', 0)
+                    print(f"   {mfg}: {new} new, {updated} updated, {errors} errors")
         else:
             print("❌ Failed to sync templates")
     
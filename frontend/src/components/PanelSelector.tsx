@@ -48,8 +48,7 @@ const PanelSelector: React.FC<PanelSelectorProps> = ({ onPanelSelect }) => {
   const fetchPanels = async () => {
     try {
       setLoading(true);
-      const response = await panelAPI.getAllPanels();
-      setPanels(response.data);
+      setPanels(await panelAPI.getAllPanels());
     } catch (err) {
       setError('Failed to fetch panels');
       console.error('Error fetching panels:', err);
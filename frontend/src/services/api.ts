@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { Panel, PanelPage } from '../types';
 
 // Use environment variable if available, otherwise fall back to development defaults
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000/api';
@@ -73,7 +74,19 @@ export const templateAPI = {
 
 // Panel API (updated for template system)
 export const panelAPI = {
-  getAllPanels: () => api.get('/panels/'),
+  getPanels: (afterId: number = 0, limit: number = 100) => 
+    api.get<PanelPage>('/panels/', { params: { after_id: afterId, limit } }),
+  // Follows the keyset cursor until the last page
+  getAllPanels: async (): Promise<Panel[]> => {
+    const panels: Panel[] = [];
+    let afterId: number | null = 0;
+    while (afterId !== null) {
+      const response = await panelAPI.getPanels(afterId);
+      panels.push(...response.data.items);
+      afterId = response.data.next;
+    }
+    return panels;
+  },
   getPanel: (id: number) => api.get(`/panels/${id}`),
   createPanel: (panel: any) => api.post('/panels/', panel),
   updatePanel: (id: number, panel: any) => api.put(`/panels/${id}`, panel),
@@ -85,11 +98,6 @@ export const panelAPI = {
 
 // Device API (updated for template system)  
 export const deviceAPI = {
-  // Legacy endpoints (still available but deprecated)
-  getAllDeviceTypes: () => api.get('/devices/types'),
-  getDeviceType: (id: number) => api.get(`/devices/types/${id}`),
-  createDeviceType: (device: any) => api.post('/devices/types', device),
-  
   // Slot management (now uses device_template_id)
   updatePanelSlot: (slotId: number, slot: any) => api.put(`/devices/slots/${slotId}`, slot),
   removeDeviceFromSlot: (slotId: number) => api.delete(`/devices/slots/${slotId}/device`),
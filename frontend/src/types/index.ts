@@ -51,7 +51,7 @@ export interface DeviceTemplate {
   pole_count?: number;
   width_in_modules: number;
   mounting_type?: string;
-  features?: string;
+  features?: string | string[] | Record<string, unknown>;
   description?: string;
   is_active: boolean;
   created_at: string;
@@ -75,7 +75,7 @@ export interface DeviceTemplateCreate {
   pole_count?: number;
   width_in_modules?: number;
   mounting_type?: string;
-  features?: string;
+  features?: string | string[] | Record<string, unknown>;
   description?: string;
   is_active?: boolean;
 }
@@ -94,6 +94,11 @@ export interface Panel {
   slots?: PanelSlot[];
 }
 
+export interface PanelPage {
+  items: Panel[];
+  next: number | null;
+}
+
 export interface PanelCreate {
   name: string;
   template_id: number;
@@ -111,7 +116,7 @@ export interface PanelSlot {
   device_template_id?: number | null;
   device_label?: string;
   current_setting?: number;
-  custom_properties?: string;
+  custom_properties?: string | string[] | Record<string, unknown>;
   is_occupied: boolean;
   spans_slots: number;
   installed_date?: string;
@@ -124,7 +129,7 @@ export interface PanelSlotUpdate {
   device_template_id?: number | null;
   device_label?: string;
   current_setting?: number;
-  custom_properties?: string;
+  custom_properties?: string | string[] | Record<string, unknown>;
   spans_slots?: number;
   installed_date?: string;
 }
@@ -156,19 +161,6 @@ export interface WireCreate {
   length?: number;
 }
 
-// Legacy interfaces (for backward compatibility)
-export interface DeviceType {
-  id: number;
-  name: string;
-  category: string;
-  manufacturer: string;
-  model: string;
-  slots_required: number;
-  max_current?: number;
-  voltage_range?: string;
-  description?: string;
-}
-
 export interface DeviceLibraryItem extends DeviceTemplate {
   // DeviceLibraryItem is now based on DeviceTemplate
 }
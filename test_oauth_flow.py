@@ -4,21 +4,110 @@ Test script for DigiKey OAuth flow
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import webbrowser
 import json
-from urllib.parse import urlparse, parse_qs
+import re
+import threading
+from urllib.parse import unquote_plus
+
+# orjson is installed with the backend requirements; the stdlib serves otherwise
+try:
+    import orjson
+    json_loads = orjson.loads
+    
+    def json_dumps(value, indent=False) -> str:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps(value, indent=False) -> str:
+        return json.dumps(value, indent=2 if indent else None)
+
+# The two authorization URL query parameters worth showing, still percent-encoded
+AUTH_QUERY_PARAM_PATTERN = re.compile(r"[?&](client_id|redirect_uri)=([^&]*)")
+
+# The probes return JSON and never redirect; a stalled server fails fast instead of hanging
+GET_KWARGS = {"timeout": (0.5, 2.0), "allow_redirects": False}
+
+# Last (ETag, body) of each revalidated probe URL, kept for the life of the process so a
+# repeated run gets bodiless 304s for unchanged responses; nothing is written to disk
+PROBE_CACHE = {}
+PROBE_CACHE_LOCK = threading.Lock()
+
+def cached_get(session, base_url, path):
+    """GET a JSON endpoint with If-None-Match, reusing the cached body on a 304"""
+    url = f"{base_url}{path}"
+    with PROBE_CACHE_LOCK:
+        cached = PROBE_CACHE.get(url)
+    
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = session.get(url, headers=headers, **GET_KWARGS)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    
+    body = json_loads(response.content)
+    etag = response.headers.get("ETag")
+    if response.ok and etag:
+        with PROBE_CACHE_LOCK:
+            PROBE_CACHE[url] = (etag, body)
+    return body
+
+def fetch_probes(session, base_url, test_code):
+    """The status, auth and callback probe answers, keyed by those names. One /diagnose
+    round trip gets all three ({"status": ..., "auth": ..., "callback": ...}); a backend
+    without it is probed three times at once. A probe that failed maps to its exception."""
+    try:
+        diagnosis = cached_get(session, base_url, f"/api/template-sync/diagnose?code={test_code}")
+    except Exception as e:
+        return {"status": e, "auth": e, "callback": e}
+    if "status" in diagnosis:
+        return diagnosis
+    
+    def get_json(path):
+        return json_loads(session.get(f"{base_url}{path}", **GET_KWARGS).content)
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        probes = {
+            "status": executor.submit(cached_get, session, base_url, "/api/template-sync/status"),
+            "auth": executor.submit(cached_get, session, base_url, "/api/template-sync/auth-url"),
+            "callback": executor.submit(get_json, f"/api/template-sync/callback-info?code={test_code}"),
+        }
+    return {name: probe.exception() or probe.result() for name, probe in probes.items()}
+
+def probe_answer(answer):
+    """A fetched probe body, re-raising the probe's failure"""
+    if isinstance(answer, Exception):
+        raise answer
+    return answer
+
+# Keep-alive connections from one pool serve every probe, across repeated runs in one process
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+SESSION.headers.update({"Accept": "application/json"})
+
+def get_session():
+    """The shared probe session, e.g. for a test runner to mount its own retry adapter on"""
+    return SESSION
 
 def test_oauth_flow():
     """Test the complete OAuth flow"""
-    base_url = "http://localhost:8000"
-    
+    check_oauth_flow(get_session(), "http://localhost:8000")
+
+def check_oauth_flow(session, base_url):
+    """Probe each OAuth flow endpoint over the given session"""
     print("🔍 Testing DigiKey OAuth Flow...")
     
+    # The probes don't depend on each other, so they are all fetched up front and
+    # reported in step order below
+    test_code = "test123"
+    probes = fetch_probes(session, base_url, test_code)
+    
     # Step 1: Get API status
     print("\n1️⃣ Checking API status...")
     try:
-        response = requests.get(f"{base_url}/api/template-sync/status")
-        status = response.json()
+        status = probe_answer(probes["status"])
         print(f"   API Configured: {status['api_configured']}")
         print(f"   Authenticated: {status['authenticated']}")
         print(f"   Sandbox Mode: {status['sandbox_mode']}")
@@ -34,16 +123,14 @@ def test_oauth_flow():
     # Step 2: Get authorization URL
     print("\n2️⃣ Getting authorization URL...")
     try:
-        response = requests.get(f"{base_url}/api/template-sync/auth-url")
-        auth_data = response.json()
+        auth_data = probe_answer(probes["auth"])
         auth_url = auth_data['authorization_url']
         print(f"   Authorization URL: {auth_url}")
         
-        # Parse the URL to show components
-        parsed = urlparse(auth_url)
-        params = parse_qs(parsed.query)
-        print(f"   Client ID: {params.get('client_id', [''])[0][:20]}...")
-        print(f"   Redirect URI: {params.get('redirect_uri', [''])[0]}")
+        # Pick out the URL components to show
+        params = dict(AUTH_QUERY_PARAM_PATTERN.findall(auth_url))
+        print(f"   Client ID: {unquote_plus(params.get('client_id', ''))[:20]}...")
+        print(f"   Redirect URI: {unquote_plus(params.get('redirect_uri', ''))}")
         
     except Exception as e:
         print(f"❌ Failed to get auth URL: {e}")
@@ -60,11 +147,9 @@ def test_oauth_flow():
     
     # Step 4: Test callback endpoint format
     print("\n4️⃣ Testing callback endpoint format...")
-    test_code = "test123"
     try:
-        response = requests.get(f"{base_url}/api/template-sync/callback-info?code={test_code}")
-        callback_data = response.json()
-        print(f"   Callback response: {json.dumps(callback_data, indent=2)}")
+        callback_data = probe_answer(probes["callback"])
+        print(f"   Callback response: {json_dumps(callback_data, indent=True)}")
     except Exception as e:
         print(f"❌ Failed to test callback: {e}")
     